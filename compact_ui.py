@@ -4,11 +4,20 @@ Compact Agent Parser UI - Clean and Small
 """
 
 import streamlit as st
+import hashlib
+import importlib
 import subprocess
+import io
+import itertools
+import json
+import logging
+import re
 import tempfile
 import os
+import queue
+import threading
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
 
 # Import our parsers
@@ -26,6 +35,137 @@ except ImportError:
         generate_enhanced_grok_cef_vrl = None
         generate_enhanced_grok_syslog_vrl = None
 
+# Optional Hyperscan for single-pass multi-pattern vendor detection
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+# Syslog vendor rules in priority order: (pattern, vendor, product, log_source, log_type)
+SYSLOG_VENDOR_RULES = (
+    (r'(cisco|asa|ios|nexus|cat|switch|router)', "cisco", "cisco", "cisco_network", "Network"),
+    (r'(fortinet|fortigate|forti)', "fortinet", "fortigate", "fortinet_fortigate", "Security"),
+    (r'(palo\s+alto|panos|pa-)', "paloalto", "pan-os", "paloalto_firewall", "Security"),
+    (r'(checkpoint|check\s+point|cp-)', "checkpoint", "smartdefence/firewall", "checkpoint_firewall", "Security"),
+    (r'(sonicwall|sonicos)', "sonicwall", "firewall", "sonicwall_firewall", "Security"),
+    (r'(sshd|accepted password|failed password)', "OpenSSH", "OpenSSH Server", "OpenSSH Server", "Security"),
+    (r'(firewall|iptables|ufw|pfsense)', "Linux", "iptables", "Linux Firewall", "Security"),
+    (r'(apache|nginx|httpd)', "Web Server", "Web Server", "Web Server", "Web"),
+    (r'(mysql|postgres|mongodb)', "Database", "Database", "Database", "Database"),
+    (r'(dirsrv|ipa|ldap|directory)', "RedHat", "IPA", "ipa-dirsrv", "System"),
+    (r'(windows|microsoft|win32)', "microsoft", "windows", "winevtlogs", "System"),
+    (r'(linux|ubuntu|centos|rhel)', "linux", "syslog", "linux_syslog", "System"),
+)
+
+# Cisco product refinement: (pattern, product, log_source, log_type)
+CISCO_PRODUCT_RULES = (
+    (re.compile(r'(asa|firewall)', re.IGNORECASE), "asa", "cisco_asa", "Security"),
+    (re.compile(r'(ios)', re.IGNORECASE), "ios", "cisco_ios", "Network"),
+)
+
+_SYSLOG_VENDOR_RES = [re.compile(rule[0], re.IGNORECASE) for rule in SYSLOG_VENDOR_RULES]
+
+def _build_vendor_database():
+    """Compile all vendor patterns into one Hyperscan database (None if unavailable)"""
+    if hyperscan is None:
+        return None
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[rule[0].encode() for rule in SYSLOG_VENDOR_RULES],
+            ids=list(range(len(SYSLOG_VENDOR_RULES))),
+            elements=len(SYSLOG_VENDOR_RULES),
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(SYSLOG_VENDOR_RULES)
+        )
+        return db
+    except Exception:
+        return None
+
+_VENDOR_DB = _build_vendor_database()
+
+# Optional ijson for streaming key extraction from large JSON pastes
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# JSON payloads at least this large are streamed instead of fully parsed
+JSON_STREAM_THRESHOLD = 64 * 1024
+
+# Top-level JSON keys used for identification, in priority order
+JSON_VENDOR_KEYS = ("vendor", "source", "service")
+JSON_PRODUCT_KEYS = ("product", "application", "app")
+_JSON_IDENTITY_KEYS = frozenset(JSON_VENDOR_KEYS + JSON_PRODUCT_KEYS)
+
+def detect_syslog_vendor(log_content):
+    """Return the highest-priority vendor rule matching the log, or None"""
+    # Hyperscan folds case and matches \w/\s in ASCII only, so other text takes the regex path
+    if _VENDOR_DB is not None and log_content.isascii():
+        matches = []
+
+        def on_match(rule_id, start, end, flags, context):
+            matches.append(rule_id)
+
+        _VENDOR_DB.scan(log_content.encode('ascii'), match_event_handler=on_match)
+        return SYSLOG_VENDOR_RULES[min(matches)] if matches else None
+
+    for rule, pattern in zip(SYSLOG_VENDOR_RULES, _SYSLOG_VENDOR_RES):
+        if pattern.search(log_content):
+            return rule
+    return None
+
+# Characters of the pasted log inspected when identifying its profile
+IDENTIFY_PROBE_CHARS = 4096
+
+# RFC5424: <PRI>VER TIMESTAMP HOSTNAME APP-NAME PROCID MSGID STRUCTURED-DATA MSG
+_RFC5424_HEADER_RE = re.compile(r'<(\d+)>(\d+)\s+\S+\s+(\S+)\s+(\S+)\s+')
+
+def parse_rfc5424_header(line):
+    """Extract (hostname, program) from an RFC5424 header, or None"""
+    # Fast path: well-formed header at the start of the line
+    if line.startswith('<'):
+        pri_end = line.find('>')
+        rest = line[pri_end + 1:]
+        parts = rest.split(None, 4)
+        # The version must follow '>' directly, as in the regex
+        if (pri_end > 1 and line[1:pri_end].isdecimal() and rest[:1].isdecimal()
+                and len(parts) == 5 and parts[0].isdecimal()):
+            return parts[2], parts[3]
+
+    # Slow path: header somewhere inside the line
+    syslog_match = _RFC5424_HEADER_RE.search(line)
+    if syslog_match:
+        return syslog_match.group(3), syslog_match.group(4)
+    return None
+
+def extract_json_identity_fields(text):
+    """Return the top-level vendor/product candidate fields of a JSON log"""
+    if ijson is None or len(text) < JSON_STREAM_THRESHOLD:
+        json_data = json.loads(text)
+        if not isinstance(json_data, dict):
+            return {}
+        return {key: json_data[key] for key in _JSON_IDENTITY_KEYS if isinstance(json_data.get(key), str)}
+
+    # Stop streaming once the highest-priority vendor and product keys are seen
+    found = {}
+    for prefix, event, value in ijson.parse(io.BytesIO(text.encode('utf-8'))):
+        if event == 'string' and prefix in _JSON_IDENTITY_KEYS:
+            found[prefix] = value
+            if JSON_VENDOR_KEYS[0] in found and JSON_PRODUCT_KEYS[0] in found:
+                break
+    return found
+
+def format_profile_json(profile, observer_type):
+    """Log profile as the indented JSON shown in the UI (quotes and non-ASCII kept valid and readable)"""
+    profile_dict = {
+        "observer.type": observer_type,
+        "log_format": profile['log_format'],
+        "observer.source": profile['log_source'],
+        "observer.product": profile['product'],
+        "observer.vendor": profile['vendor']
+    }
+    return json.dumps(profile_dict, indent=4, ensure_ascii=False)
+
 def get_docker_container_info():
     """Get detailed Docker container information"""
     try:
@@ -73,21 +213,51 @@ def get_docker_container_info():
     except Exception as e:
         return {"running": False, "name": None, "image": None, "status": f"Error: {str(e)}", "ports": None}
 
-def validate_with_docker(vrl_code, filename):
-    """Validate VRL using the running Docker container"""
-    try:
-        # Create temporary files in current directory
-        temp_file = f"temp_validation_{int(time.time())}.vrl"
-        config_file = f"temp_config_{int(time.time())}.yaml"
-        
-        # Write VRL file
-        with open(temp_file, 'w') as f:
-            f.write(vrl_code)
-        
-        # Create Vector config with inline VRL
-        indented_vrl = '\n'.join('      ' + line for line in vrl_code.split('\n'))
-        
-        config_content = f"""data_dir: "/tmp"
+# Static UI content, built once per process instead of on every rerun
+PAGE_CONFIG = {
+    "page_title": "🤖 Agent Parser",
+    "page_icon": "🤖",
+    "layout": "centered",
+    "initial_sidebar_state": "collapsed"
+}
+
+RAG_METRICS = (
+    ("📊 KB", "1,210"),
+    ("🔤 Model", "MiniLM"),
+    ("💾 DB", "Active"),
+    ("📚 ECS", "Ready"),
+)
+
+# Long-lived container that every validation execs into
+VALIDATOR_CONTAINER = "dpm-test-config-validator"
+
+CONTAINER_START_CMD = f"docker run -d --name {VALIDATOR_CONTAINER} vonwig/inotifywait:latest"
+
+# Per-process counter for unique validation config names
+_VALIDATION_COUNTER = itertools.count()
+
+# Seconds allowed for one docker exec validation
+VALIDATION_TIMEOUT = 30
+
+# Exit codes of `vector validate` itself (78 = EX_CONFIG, invalid config) and the markers it
+# prints; anything else came from docker/sh (no such container, daemon down, ...), not Vector
+VECTOR_VALIDATE_EXIT_CODES = (0, 78)
+VECTOR_VALIDATE_MARKERS = ("Loaded [", "Failed to load", "Validated")
+
+# Where validated parsers are saved, and their filename timestamp format
+DESKTOP_DIR = Path.home() / "Desktop"
+_TS_FMT = "%Y%m%d_%H%M%S"
+
+# Seconds the UI waits for the background save before reporting it as pending
+SAVE_TIMEOUT = 5
+
+logger = logging.getLogger(__name__)
+
+def build_vector_config(vrl_code):
+    """Vector config (stdin -> remap -> console) with the VRL inlined"""
+    indented_vrl = '\n'.join('      ' + line for line in vrl_code.split('\n'))
+    
+    return f"""data_dir: "/tmp"
 timezone: "UTC"
 
 sources:
@@ -108,35 +278,32 @@ sinks:
     encoding:
       codec: json
 """
-        
-        # Write config file
-        with open(config_file, 'w') as f:
-            f.write(config_content)
-        
-        # Run Docker validation using the running container
-        cmd = [
-            'docker', 'exec', '-i', 'dpm-test-config-validator',
-            'vector', 'validate', f'/app/{os.path.basename(config_file)}'
-        ]
-        
-        # Copy config to container
-        copy_cmd = ['docker', 'cp', config_file, 'dpm-test-config-validator:/app/']
-        subprocess.run(copy_cmd, capture_output=True, timeout=10)
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        
-        # Clean up temporary files
-        try:
-            os.remove(temp_file)
-            os.remove(config_file)
-        except:
-            pass
-        
+
+def _validation_command():
+    """docker exec that writes the config from stdin, validates it and removes it"""
+    # Config path inside the container (written from stdin, removed after validation)
+    config_file = f"/app/temp_config_{os.getpid()}_{next(_VALIDATION_COUNTER)}.yaml"
+    return [
+        'docker', 'exec', '-i', VALIDATOR_CONTAINER,
+        'sh', '-c', 'cat > "$1" && vector validate "$1"; rc=$?; rm -f "$1"; exit $rc',
+        'sh', config_file
+    ]
+
+def _run_validation(vrl_code):
+    """One docker exec validation: the config goes over stdin to the warm container"""
+    try:
+        proc = subprocess.run(
+            _validation_command(),
+            input=build_vector_config(vrl_code),
+            capture_output=True,
+            text=True,
+            timeout=VALIDATION_TIMEOUT
+        )
         return {
-            "success": result.returncode == 0,
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "return_code": result.returncode
+            "success": proc.returncode == 0,
+            "stdout": proc.stdout,
+            "stderr": proc.stderr,
+            "return_code": proc.returncode
         }
         
     except Exception as e:
@@ -147,33 +314,370 @@ sinks:
             "error_details": str(e)
         }
 
+def _validator_container_running():
+    """Health check for the validator container"""
+    try:
+        result = subprocess.run(['docker', 'inspect', '-f', '{{.State.Running}}', VALIDATOR_CONTAINER],
+                              capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() == "true"
+    except Exception:
+        return False
+
+def start_validator_container():
+    """Start the existing (stopped) validator container; True if it is running afterwards"""
+    if _validator_container_running():
+        return True
+    try:
+        subprocess.run(['docker', 'start', VALIDATOR_CONTAINER], capture_output=True, timeout=30)
+    except Exception:
+        return False
+    return _validator_container_running()
+
+@st.cache_resource(show_spinner=False)
+def ensure_validator_container():
+    """Warm the validator container once per process, at app start"""
+    return start_validator_container()
+
+def validate_with_docker(vrl_code, filename):
+    """Validate VRL using the running Docker container"""
+    result = _run_validation(vrl_code)
+    
+    # The warm container went away - restart it once and retry
+    if not result["success"] and "is not running" in result["stderr"] and start_validator_container():
+        result = _run_validation(vrl_code)
+    return result
+
+def is_vector_verdict(result):
+    """True if the validation result is Vector's own verdict on the VRL"""
+    if "error_details" in result:
+        return False
+    if result["return_code"] in VECTOR_VALIDATE_EXIT_CODES:
+        return True
+    output = result["stdout"] + result["stderr"]
+    return any(marker in output for marker in VECTOR_VALIDATE_MARKERS)
+
+def validate_vrl(vrl_code, filename):
+    """validate_with_docker, raising RuntimeError when Vector did not get to judge the VRL"""
+    result = validate_with_docker(vrl_code, filename)
+    if not is_vector_verdict(result):
+        raise RuntimeError(
+            result.get("error_details")
+            or result["stderr"].strip()
+            or f"docker exec exited with code {result['return_code']}"
+        )
+    return result
+
+@st.cache_resource(show_spinner=False)
+def io_pool():
+    """Background workers for file writes, shared by all sessions"""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="vrl-io")
+
+def write_vrl_file(filepath, vrl_code):
+    """Write the VRL as UTF-8 bytes through a raw fd (no text-mode buffering)"""
+    data = memoryview(vrl_code.encode('utf-8'))
+    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
+def _log_save_failure(future):
+    """Log a background VRL write that failed after the UI stopped waiting for it"""
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Could not save validated parser: {error}")
+
+@st.cache_resource(show_spinner=False)
+def cef_fallback_template():
+    """CEF fallback VRL, generated once per process (None if unavailable)"""
+    return generate_enhanced_grok_cef_vrl() if generate_enhanced_grok_cef_vrl is not None else None
+
+@st.cache_resource(show_spinner=False)
+def syslog_fallback_template():
+    """Syslog fallback VRL, generated once per process (None if unavailable)"""
+    return generate_enhanced_grok_syslog_vrl() if generate_enhanced_grok_syslog_vrl is not None else None
+
+# Fallback parser per lower-cased log type: (label, template)
+FALLBACK_TEMPLATES = {
+    "security": ("CEF", cef_fallback_template),
+    "cef": ("CEF", cef_fallback_template),
+    "system": ("Syslog", syslog_fallback_template),
+    "syslog": ("Syslog", syslog_fallback_template),
+}
+DEFAULT_FALLBACK_TEMPLATE = ("CEF", cef_fallback_template)
+
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def validate_with_docker_cached(vrl_code, filename):
+    """validate_vrl memoized on the VRL text, so unchanged code is not revalidated.
+    
+    Docker-level failures raise, so st.cache_data only ever stores Vector's verdicts.
+    """
+    return validate_vrl(vrl_code, filename)
+
+@st.cache_resource(show_spinner=False)
+def get_indexed_rag_system():
+    """Open (or build) the RAG system and its index once per process"""
+    from complete_rag_system import CompleteRAGSystem
+    
+    rag_system = CompleteRAGSystem(use_quantized=True)
+    if not rag_system.load_persisted_index():
+        rag_system.build_langchain_index()
+    return rag_system
+
+def get_error_handler(openrouter_key):
+    """Enhanced error handler bound to the shared RAG system, one per API key"""
+    from enhanced_error_handler import get_error_handler as shared_error_handler
+    
+    return shared_error_handler(get_indexed_rag_system(), openrouter_key)
+
+@st.cache_resource(show_spinner=False)
+def get_regeneration_cache():
+    """Process-wide near-duplicate cache of error-context regenerations"""
+    from enhanced_error_handler import SemanticVRLCache
+    
+    return SemanticVRLCache()
+
+# Cosine similarity above which a regenerated VRL counts as a repeat of a failed one
+REPEAT_SIMILARITY = 0.98
+
+@st.cache_resource(show_spinner=False)
+def get_vrl_history(dim):
+    """Process-wide history of failed VRL versions (embeddings of width dim)"""
+    from enhanced_error_handler import VRLHistory
+    
+    return VRLHistory(dim)
+
+def record_failed_vrl(rag_system, failed_vrl, new_vrl, error_context):
+    """Remember the failed VRL; return the similarity if new_vrl repeats an earlier failure with the same error"""
+    try:
+        failed_embed, new_embed = rag_system.encode_batch([failed_vrl, new_vrl])
+    except Exception:
+        return None
+    history = get_vrl_history(len(failed_embed))
+    match = history.nearest(new_embed, error_context)
+    history.add(failed_vrl, error_context, failed_embed)
+    return match[1] if match is not None and match[1] >= REPEAT_SIMILARITY else None
+
+def _preload_regeneration_stack():
+    """Import the LLM/RAG modules and open the shared RAG index ahead of the first failure"""
+    try:
+        importlib.import_module("enhanced_error_handler")
+        get_indexed_rag_system()
+    except Exception:
+        pass  # The regeneration path retries and reports the error itself
+
+@st.cache_resource(show_spinner=False)
+def start_preloader():
+    """Warm the regeneration stack in a daemon thread, once per process"""
+    thread = threading.Thread(target=_preload_regeneration_stack, name="vrl-preload", daemon=True)
+    thread.start()
+    return thread
+
+def regenerate_with_streaming(error_handler, vrl_code, error_context, log_content, log_format):
+    """Run the LLM regeneration in a worker thread, showing the VRL as it streams in"""
+    tokens = queue.Queue()
+    outcome = {}
+    
+    def worker():
+        try:
+            outcome["result"] = error_handler.regenerate_vrl_with_error_context(
+                vrl_code, error_context, log_content, log_format, on_token=tokens.put
+            )
+        except Exception as e:
+            outcome["error"] = e
+    
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    
+    # Streamlit elements may only be updated from the script thread
+    placeholder = st.empty()
+    partial_vrl = []
+    while thread.is_alive() or not tokens.empty():
+        try:
+            partial_vrl.append(tokens.get(timeout=0.1))
+        except queue.Empty:
+            continue
+        while not tokens.empty():
+            partial_vrl.append(tokens.get_nowait())
+        placeholder.code("".join(partial_vrl), language="vrl")
+    placeholder.empty()
+    
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+# Reruns triggered inside a fragment only re-execute the fragment (Streamlit >= 1.37)
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+@_fragment
+def _regeneration_result_fragment(regeneration_result, error_context, repeat_similarity):
+    """Regeneration details and the retry button - display only, so its reruns never regenerate"""
+    insights = regeneration_result['insights']
+    st.success(f"🔄 **{regeneration_result['regeneration_reason']}**")
+    if repeat_similarity is not None:
+        st.warning(f"⚠️ The regenerated parser is {repeat_similarity:.0%} similar to one that already failed with this error")
+    
+    # Show error analysis
+    with st.expander("🔍 Error Analysis"):
+        st.code(error_context, language="text")
+        
+    with st.expander("🧠 Intelligence Applied"):
+        st.write(f"**Error Type:** {insights['error_type']}")
+        if insights['suggestions']:
+            st.write("**Suggestions:**")
+            for suggestion in insights['suggestions']:
+                st.write(f"• {suggestion}")
+        if insights['fixes_needed']:
+            st.write("**Fixes Applied:**")
+            for fix in insights['fixes_needed']:
+                st.write(f"• {fix}")
+    
+    st.info("💡 **AI has analyzed the error and applied intelligent fixes to the VRL parser**")
+    
+    # Auto-retry validation
+    if st.button("🔄 Auto-Retry Validation", type="primary", use_container_width=True):
+        st.rerun()
+
+@_fragment
+def _manual_regenerate_fragment():
+    """Manual regenerate button, kept clickable after the validation run that showed it"""
+    if st.button("🔄 Manual Regenerate", type="secondary", use_container_width=True):
+        st.session_state.vrl_generated = False
+        st.session_state.generated_vrl = ""
+        st.rerun()
+
+def handle_validation_result(result, vrl_code):
+    """Validation outcome: save on success, error-context regeneration on failure.
+    
+    Runs once per Validate click, outside any fragment: the LLM call and the
+    session-state writes must not repeat when a fragment widget reruns.
+    """
+    if result["success"]:
+        st.success("✅ Docker Validation PASSED!")
+        
+        # Save to desktop
+        filename = f"validated_parser_{time.strftime(_TS_FMT)}.vrl"
+        filepath = DESKTOP_DIR / filename
+        
+        if not DESKTOP_DIR.is_dir():
+            st.warning(f"⚠️ Not saved: {DESKTOP_DIR} does not exist")
+        else:
+            # Write off the script thread, but report the real outcome
+            future = io_pool().submit(write_vrl_file, filepath, vrl_code)
+            try:
+                future.result(timeout=SAVE_TIMEOUT)
+            except FutureTimeoutError:
+                future.add_done_callback(_log_save_failure)
+                st.info(f"💾 Still saving to Desktop: {filename}")
+            except OSError as e:
+                st.error(f"❌ Could not save to Desktop: {e}")
+            else:
+                st.success(f"💾 Saved to Desktop: {filename}")
+        
+    else:
+        st.error("❌ Docker Validation FAILED!")
+        if result["stderr"]:
+            st.code(result["stderr"], language="text")
+        
+        # Automatic regeneration with error context
+        st.markdown("#### 🔄 Auto-Regeneration with Error Context")
+        st.info("🤖 **Sending error details to agent for intelligent regeneration...**")
+        
+        with st.spinner("🤖 Analyzing error and regenerating VRL intelligently..."):
+            # Store error details for regeneration
+            error_context = result["stderr"] if result["stderr"] else result.get("error_details", "Validation failed")
+            
+            # Generate new VRL based on log type with intelligent error analysis
+            log_type = st.session_state.get('log_type', 'Unknown')
+            
+            try:
+                # Get OpenRouter API key from session state or use default
+                openrouter_key = st.session_state.get('openrouter_api_key', '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')
+                
+                # Enhanced error handler with OpenRouter (shared RAG index, built once per process)
+                error_handler = get_error_handler(openrouter_key)
+                
+                # Get log content and format for regeneration
+                log_content = st.session_state.get('identified_log_content', '')
+                log_format = st.session_state.log_profile.get('log_format', 'unknown') if 'log_profile' in st.session_state else 'unknown'
+                
+                # Same validated VRL + error as the last regeneration in this session - reuse it
+                regen_token = hashlib.blake2b((vrl_code + error_context).encode(), digest_size=16).hexdigest()
+                if st.session_state.get('last_regen_token') == regen_token:
+                    regeneration_result = st.session_state.last_regen_result
+                else:
+                    # Reuse the fix for a near-identical earlier failure, else regenerate with error context
+                    regeneration_cache = get_regeneration_cache()
+                    regeneration_result = regeneration_cache.get(vrl_code, error_context, log_format)
+                    if regeneration_result is None:
+                        regeneration_result = regenerate_with_streaming(
+                            error_handler,
+                            vrl_code,
+                            error_context,
+                            log_content,
+                            log_format
+                        )
+                        if regeneration_result['success']:
+                            regeneration_cache.put(vrl_code, error_context, log_format, regeneration_result)
+                    if regeneration_result['success']:
+                        st.session_state.last_regen_token = regen_token
+                        st.session_state.last_regen_result = regeneration_result
+                        st.session_state.last_regen_repeat = record_failed_vrl(
+                            error_handler.rag_system,
+                            vrl_code,
+                            regeneration_result['new_vrl'],
+                            error_context
+                        )
+                
+                if regeneration_result['success']:
+                    # Update VRL code with regenerated version
+                    st.session_state.generated_vrl = regeneration_result['new_vrl']
+                    
+                    _regeneration_result_fragment(
+                        regeneration_result,
+                        error_context,
+                        st.session_state.get('last_regen_repeat')
+                    )
+                else:
+                    st.error("❌ Intelligent regeneration failed")
+                    
+            except Exception as e:
+                st.error(f"❌ Regeneration failed: {e}")
+                
+                # Fallback to basic regeneration
+                try:
+                    parser_label, fallback_template = FALLBACK_TEMPLATES.get(log_type.lower(), DEFAULT_FALLBACK_TEMPLATE)
+                    new_vrl = fallback_template()
+                    if new_vrl is not None:
+                        st.session_state.generated_vrl = new_vrl
+                        st.success(f"🔄 Fallback {parser_label} Parser Regenerated!")
+                    else:
+                        st.error(f"❌ {parser_label} parser not available for fallback!")
+                        
+                except Exception as e2:
+                    st.error(f"❌ Fallback regeneration also failed: {e2}")
+                    
+                    # Manual regeneration
+                    _manual_regenerate_fragment()
+
 def main():
-    st.set_page_config(
-        page_title="🤖 Agent Parser",
-        page_icon="🤖",
-        layout="centered",
-        initial_sidebar_state="collapsed"
-    )
+    st.set_page_config(**PAGE_CONFIG)
     
     # Compact Header
     st.title("🤖 Agent Parser")
     st.caption("Smart Log Processing")
     
     # Compact RAG Status
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("📊 KB", "1,210")
-    with col2:
-        st.metric("🔤 Model", "MiniLM")
-    with col3:
-        st.metric("💾 DB", "Active")
-    with col4:
-        st.metric("📚 ECS", "Ready")
+    for col, (label, value) in zip(st.columns(len(RAG_METRICS)), RAG_METRICS):
+        col.metric(label, value)
     
     st.success("✅ RAG System Ready")
     
     # Detailed Docker Container Info
     st.markdown("### 🐳 Docker Container")
+    ensure_validator_container()
+    start_preloader()
     container_info = get_docker_container_info()
     
     if container_info["running"]:
@@ -190,13 +694,15 @@ def main():
         
         # Show container details in expandable section
         with st.expander("📋 Container Details"):
-            st.code(f"""Container Name: {container_info["name"]}
-Image: {container_info["image"]}
-Status: {container_info["status"]}
-Ports: {container_info["ports"] if container_info["ports"] != "None" else "None"}""", language="text")
+            st.code("\n".join([
+                f"Container Name: {container_info['name']}",
+                f"Image: {container_info['image']}",
+                f"Status: {container_info['status']}",
+                f"Ports: {container_info['ports']}"
+            ]), language="text")
     else:
         st.error("❌ No Container Running")
-        st.info("💡 Start container with: `docker run -d --name dpm-test-config-validator vonwig/inotifywait:latest`")
+        st.info(f"💡 Start container with: `{CONTAINER_START_CMD}`")
         
         # Show all running containers
         with st.expander("🔍 Check All Running Containers"):
@@ -222,14 +728,16 @@ Ports: {container_info["ports"] if container_info["ports"] != "None" else "None"
     
     # Identify Log Profile Button
     if st.button("🔍 Identify Log", type="primary", use_container_width=True):
-        if not log_input.strip():
+        # Identification only needs the header, so bound the work for huge pastes
+        probe = log_input.lstrip()[:IDENTIFY_PROBE_CHARS].rstrip()
+        if not probe:
             st.error("❌ Please enter log content!")
             return
         
         # Smart vendor detection
-        if log_input.strip().startswith("CEF:"):
+        if probe.startswith("CEF:"):
             try:
-                cef_parts = log_input.strip().split("|")
+                cef_parts = probe.split("|", 3)
                 if len(cef_parts) >= 3:
                     vendor = cef_parts[1].strip()
                     product = cef_parts[2].strip()
@@ -250,27 +758,12 @@ Ports: {container_info["ports"] if container_info["ports"] != "None" else "None"
                 vendor = "Unknown"
                 identified_reason = "CEF format detected"
                 
-        elif log_input.strip().startswith("{") or log_input.strip().startswith("["):
+        elif probe.startswith("{") or probe.startswith("["):
             try:
-                import json
-                json_data = json.loads(log_input.strip())
-                
-                vendor = "Unknown"
-                product = "JSON Logger"
-                
-                if "vendor" in json_data:
-                    vendor = json_data["vendor"]
-                elif "source" in json_data:
-                    vendor = json_data["source"]
-                elif "service" in json_data:
-                    vendor = json_data["service"]
+                json_fields = extract_json_identity_fields(log_input.strip())
                 
-                if "product" in json_data:
-                    product = json_data["product"]
-                elif "application" in json_data:
-                    product = json_data["application"]
-                elif "app" in json_data:
-                    product = json_data["app"]
+                vendor = next((json_fields[key] for key in JSON_VENDOR_KEYS if key in json_fields), "Unknown")
+                product = next((json_fields[key] for key in JSON_PRODUCT_KEYS if key in json_fields), "JSON Logger")
                 
                 log_source = f"{vendor} {product}" if vendor != "Unknown" else "Application"
                 
@@ -285,10 +778,9 @@ Ports: {container_info["ports"] if container_info["ports"] != "None" else "None"
                 vendor = "Unknown"
                 identified_reason = "JSON format detected"
                 
-        elif log_input.strip().startswith("<") and ">" in log_input:
+        elif probe.startswith("<") and ">" in probe:
             try:
                 # Advanced vendor detection using main app logic
-                import re
                 vendor = "Unknown"
                 product = "Syslog"
                 log_source = "System"
@@ -298,84 +790,22 @@ Ports: {container_info["ports"] if container_info["ports"] != "None" else "None"
                 # Extract hostname and program from RFC5424 syslog for better detection
                 hostname = ""
                 program = ""
-                # RFC5424: <PRI>VER TIMESTAMP HOSTNAME APP-NAME PROCID MSGID STRUCTURED-DATA MSG
-                syslog_match = re.search(r'<(\d+)>(\d+)\s+\S+\s+(\S+)\s+(\S+)\s+', log_input.strip())
-                if syslog_match:
-                    priority, version, hostname, program = syslog_match.groups()
-                    log_content = f"{hostname} {program} {log_input}"
+                syslog_header = parse_rfc5424_header(probe)
+                if syslog_header:
+                    hostname, program = syslog_header
+                    log_content = f"{hostname} {program} {probe}"
                 else:
-                    log_content = log_input.lower()
+                    log_content = probe.lower()
                 
                 # Advanced vendor detection patterns from main app
-                if re.search(r'(?i)(cisco|asa|ios|nexus|cat|switch|router)', log_content):
-                    vendor = "cisco"
-                    if re.search(r'(?i)(asa|firewall)', log_content):
-                        product = "asa"
-                        log_source = "cisco_asa"
-                        log_type = "Security"
-                    elif re.search(r'(?i)(ios)', log_content):
-                        product = "ios"
-                        log_source = "cisco_ios"
-                        log_type = "Network"
-                    else:
-                        product = "cisco"
-                        log_source = "cisco_network"
-                        log_type = "Network"
-                elif re.search(r'(?i)(fortinet|fortigate|forti)', log_content):
-                    vendor = "fortinet"
-                    product = "fortigate"
-                    log_source = "fortinet_fortigate"
-                    log_type = "Security"
-                elif re.search(r'(?i)(palo\s+alto|panos|pa-)', log_content):
-                    vendor = "paloalto"
-                    product = "pan-os"
-                    log_source = "paloalto_firewall"
-                    log_type = "Security"
-                elif re.search(r'(?i)(checkpoint|check\s+point|cp-)', log_content):
-                    vendor = "checkpoint"
-                    product = "smartdefence/firewall"
-                    log_source = "checkpoint_firewall"
-                    log_type = "Security"
-                elif re.search(r'(?i)(sonicwall|sonicos)', log_content):
-                    vendor = "sonicwall"
-                    product = "firewall"
-                    log_source = "sonicwall_firewall"
-                    log_type = "Security"
-                elif re.search(r'(?i)(sshd|accepted password|failed password)', log_content):
-                    vendor = "OpenSSH"
-                    product = "OpenSSH Server"
-                    log_source = "OpenSSH Server"
-                    log_type = "Security"
-                elif re.search(r'(?i)(firewall|iptables|ufw|pfsense)', log_content):
-                    vendor = "Linux"
-                    product = "iptables"
-                    log_source = "Linux Firewall"
-                    log_type = "Security"
-                elif re.search(r'(?i)(apache|nginx|httpd)', log_content):
-                    vendor = "Web Server"
-                    product = "Web Server"
-                    log_source = "Web Server"
-                    log_type = "Web"
-                elif re.search(r'(?i)(mysql|postgres|mongodb)', log_content):
-                    vendor = "Database"
-                    product = "Database"
-                    log_source = "Database"
-                    log_type = "Database"
-                elif re.search(r'(?i)(dirsrv|ipa|ldap|directory)', log_content):
-                    vendor = "RedHat"
-                    product = "IPA"
-                    log_source = "ipa-dirsrv"
-                    log_type = "System"
-                elif re.search(r'(?i)(windows|microsoft|win32)', log_content):
-                    vendor = "microsoft"
-                    product = "windows"
-                    log_source = "winevtlogs"
-                    log_type = "System"
-                elif re.search(r'(?i)(linux|ubuntu|centos|rhel)', log_content):
-                    vendor = "linux"
-                    product = "syslog"
-                    log_source = "linux_syslog"
-                    log_type = "System"
+                vendor_rule = detect_syslog_vendor(log_content)
+                if vendor_rule is not None:
+                    _, vendor, product, log_source, log_type = vendor_rule
+                    if vendor == "cisco":
+                        for pattern, cisco_product, cisco_source, cisco_type in CISCO_PRODUCT_RULES:
+                            if pattern.search(log_content):
+                                product, log_source, log_type = cisco_product, cisco_source, cisco_type
+                                break
                 else:
                     # Default syslog - try to extract from hostname/program
                     if hostname:
@@ -452,14 +882,7 @@ Ports: {container_info["ports"] if container_info["ports"] != "None" else "None"
         else:
             observer_type = "system"  # Default to system instead of ngfw
         
-        profile_json = f"""{{
-    "observer.type": "{observer_type}",
-    "log_format": "{profile['log_format']}",
-    "observer.source": "{profile['log_source']}",
-    "observer.product": "{profile['product']}",
-    "observer.vendor": "{profile['vendor']}"
-}}"""
-        st.code(profile_json, language="json")
+        st.code(format_profile_json(profile, observer_type), language="json")
         
         st.caption(f"🔍 {st.session_state.identified_reason}")
         
@@ -479,18 +902,15 @@ Ports: {container_info["ports"] if container_info["ports"] != "None" else "None"
                 
                 # Get vendor information from identified profile
                 profile = st.session_state.log_profile
-                vendor = str(profile['vendor']) if profile['vendor'] else "unknown"
-                product = str(profile['product']) if profile['product'] else "unknown"
-                log_format = str(profile['log_format']) if profile['log_format'] else "unknown"
+                vendor = profile.get('vendor') or "unknown"
+                product = profile.get('product') or "unknown"
+                log_format = profile.get('log_format') or "unknown"
                 log_content = st.session_state.identified_log_content
                 
                 # Use RAG agent to generate intelligent parser
                 if rag_agent_available:
                     try:
                         agent = RAGAgentParser()
-                        # Ensure log_content is a string
-                        if not isinstance(log_content, str):
-                            log_content = str(log_content)
                         vrl_code = agent.generate_parser_with_agent(log_content, vendor, product, profile)
                         
                         # Validate generated parser
@@ -573,9 +993,9 @@ Ports: {container_info["ports"] if container_info["ports"] != "None" else "None"
             
             # Get vendor information from identified profile
             profile = st.session_state.log_profile
-            vendor = str(profile['vendor']) if profile['vendor'] else "unknown"
-            product = str(profile['product']) if profile['product'] else "unknown"
-            log_format = str(profile['log_format']) if profile['log_format'] else "unknown"
+            vendor = profile.get('vendor') or "unknown"
+            product = profile.get('product') or "unknown"
+            log_format = profile.get('log_format') or "unknown"
             log_content = st.session_state.identified_log_content
             
             # Debug information
@@ -586,9 +1006,6 @@ Ports: {container_info["ports"] if container_info["ports"] != "None" else "None"
                 try:
                     with st.spinner("🤖 AI Agent analyzing log with RAG system..."):
                         agent = RAGAgentParser()
-                        # Ensure log_content is a string
-                        if not isinstance(log_content, str):
-                            log_content = str(log_content)
                         vrl_code = agent.generate_parser_with_agent(log_content, vendor, product, profile)
                         
                         # Validate generated parser
@@ -619,9 +1036,9 @@ Ports: {container_info["ports"] if container_info["ports"] != "None" else "None"
                     vendor_routing_available = False
                     st.warning("⚠️ Template parsers not available, using generic parsers")
                 
-                vendor_lower = str(vendor).lower() if vendor else "unknown"
-                product_lower = str(product).lower() if product else "unknown"
-                log_format_lower = str(log_format).lower() if log_format else "unknown"
+                vendor_lower = vendor.lower()
+                product_lower = product.lower()
+                log_format_lower = log_format.lower()
                 
                 # Use vendor-specific template parser if available
                 if vendor_routing_available:
@@ -676,135 +1093,19 @@ Ports: {container_info["ports"] if container_info["ports"] != "None" else "None"
         st.markdown("---")
         st.subheader("🐳 Docker Validation")
         
+        force_revalidate = st.checkbox("Force revalidate", value=False, help="Ignore cached validation results")
+        
         if st.button("✅ Validate with Docker", type="primary", use_container_width=True):
-            with st.spinner("Validating..."):
-                result = validate_with_docker(vrl_code, "parser.vrl")
-            
-            if result["success"]:
-                st.success("✅ Docker Validation PASSED!")
-                
-                # Save to desktop
-                desktop_path = Path.home() / "Desktop"
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"validated_parser_{timestamp}.vrl"
-                filepath = desktop_path / filename
-                
-                with open(filepath, 'w') as f:
-                    f.write(vrl_code)
-                
-                st.success(f"💾 Saved to Desktop: {filename}")
-                
+            # Force revalidate bypasses the shared cache for this call only
+            validate = validate_vrl if force_revalidate else validate_with_docker_cached
+            try:
+                with st.spinner("Validating..."):
+                    result = validate(vrl_code, "parser.vrl")
+            except RuntimeError as e:
+                # Not a verdict on the VRL - nothing to regenerate
+                st.error(f"❌ Validation could not run: {e}")
             else:
-                st.error("❌ Docker Validation FAILED!")
-                if result["stderr"]:
-                    st.code(result["stderr"], language="text")
-                
-                # Automatic regeneration with error context
-                st.markdown("#### 🔄 Auto-Regeneration with Error Context")
-                st.info("🤖 **Sending error details to agent for intelligent regeneration...**")
-                
-                with st.spinner("🤖 Analyzing error and regenerating VRL intelligently..."):
-                    # Store error details for regeneration
-                    error_context = result["stderr"] if result["stderr"] else result.get("error_details", "Validation failed")
-                    
-                    # Generate new VRL based on log type with intelligent error analysis
-                    log_type = st.session_state.get('log_type', 'Unknown')
-                    
-                    try:
-                        # Use enhanced error handler with OpenRouter
-                        from enhanced_error_handler import EnhancedErrorHandler
-                        from complete_rag_system import CompleteRAGSystem
-                        
-                        # Initialize RAG system if not already done
-                        if 'rag_system' not in st.session_state:
-                            st.session_state.rag_system = CompleteRAGSystem()
-                            st.session_state.rag_system.build_langchain_index()
-                        
-                        # Get OpenRouter API key from session state or use default
-                        openrouter_key = st.session_state.get('openrouter_api_key', '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')
-                        
-                        # Create enhanced error handler
-                        error_handler = EnhancedErrorHandler(st.session_state.rag_system, openrouter_key)
-                        
-                        # Get log content and format for regeneration
-                        log_content = st.session_state.get('identified_log_content', '')
-                        log_format = st.session_state.log_profile.get('log_format', 'unknown') if 'log_profile' in st.session_state else 'unknown'
-                        
-                        # Regenerate with error context
-                        regeneration_result = error_handler.regenerate_vrl_with_error_context(
-                            st.session_state.generated_vrl,
-                            error_context,
-                            log_content,
-                            log_format
-                        )
-                        
-                        if regeneration_result['success']:
-                            # Update VRL code with regenerated version
-                            new_vrl = regeneration_result['new_vrl']
-                            st.session_state.generated_vrl = new_vrl
-                            
-                            # Show regeneration details
-                            insights = regeneration_result['insights']
-                            st.success(f"🔄 **{regeneration_result['regeneration_reason']}**")
-                            
-                            # Show error analysis
-                            with st.expander("🔍 Error Analysis"):
-                                st.code(error_context, language="text")
-                                
-                            with st.expander("🧠 Intelligence Applied"):
-                                st.write(f"**Error Type:** {insights['error_type']}")
-                                if insights['suggestions']:
-                                    st.write("**Suggestions:**")
-                                    for suggestion in insights['suggestions']:
-                                        st.write(f"• {suggestion}")
-                                if insights['fixes_needed']:
-                                    st.write("**Fixes Applied:**")
-                                    for fix in insights['fixes_needed']:
-                                        st.write(f"• {fix}")
-                            
-                            st.info("💡 **AI has analyzed the error and applied intelligent fixes to the VRL parser**")
-                            
-                            # Auto-retry validation
-                            if st.button("🔄 Auto-Retry Validation", type="primary", use_container_width=True):
-                                st.rerun()
-                        else:
-                            st.error("❌ Intelligent regeneration failed")
-                            
-                    except Exception as e:
-                        st.error(f"❌ Regeneration failed: {e}")
-                        
-                        # Fallback to basic regeneration
-                        try:
-                            if log_type == "Security" or "CEF" in log_type:
-                                if generate_enhanced_grok_cef_vrl is not None:
-                                    new_vrl = generate_enhanced_grok_cef_vrl()
-                                    st.session_state.generated_vrl = new_vrl
-                                    st.success("🔄 Fallback CEF Parser Regenerated!")
-                                else:
-                                    st.error("❌ CEF parser not available for fallback!")
-                            elif log_type == "System" or "Syslog" in log_type:
-                                if generate_enhanced_grok_syslog_vrl is not None:
-                                    new_vrl = generate_enhanced_grok_syslog_vrl()
-                                    st.session_state.generated_vrl = new_vrl
-                                    st.success("🔄 Fallback Syslog Parser Regenerated!")
-                                else:
-                                    st.error("❌ Syslog parser not available for fallback!")
-                            else:
-                                if generate_enhanced_grok_cef_vrl is not None:
-                                    new_vrl = generate_enhanced_grok_cef_vrl()
-                                    st.session_state.generated_vrl = new_vrl
-                                    st.success("🔄 Fallback Parser Regenerated!")
-                                else:
-                                    st.error("❌ Default parser not available for fallback!")
-                                
-                        except Exception as e2:
-                            st.error(f"❌ Fallback regeneration also failed: {e2}")
-                            
-                            # Manual regeneration
-                            if st.button("🔄 Manual Regenerate", type="secondary", use_container_width=True):
-                                st.session_state.vrl_generated = False
-                                st.session_state.generated_vrl = ""
-                                st.rerun()
+                handle_validation_result(result, vrl_code)
 
 if __name__ == "__main__":
     main()
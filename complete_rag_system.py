@@ -4,8 +4,15 @@ Handles downloading models, setting up vector database, and RAG operations
 """
 
 import os
+import re
 import json
+import asyncio
 import time
+import hashlib
+import contextlib
+import mmap
+import multiprocessing
+import threading
 import chromadb
 from chromadb.config import Settings
 try:
@@ -13,37 +20,300 @@ try:
 except ImportError:
     # Fallback for compatibility issues
     SentenceTransformer = None
+try:
+    import torch
+except ImportError:
+    torch = None
+import numpy as np
 import pandas as pd
+# Optional faster JSON decoding (orjson) and streaming of large JSON arrays (ijson)
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+try:
+    import ijson
+except ImportError:
+    ijson = None
 from typing import List, Dict, Any, Optional
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from collections import OrderedDict
 import logging
 from typing import Iterable
 
-# LangChain v0.3-style RAG (local-only)
-try:
-    from langchain_text_splitters import RecursiveCharacterTextSplitter
-    from langchain_community.vectorstores import Chroma as LCChroma
-    from langchain_community.embeddings import HuggingFaceEmbeddings
-    from langchain_core.documents import Document
-    _LC_AVAILABLE = True
-except Exception:
-    _LC_AVAILABLE = False
+# Loaded SentenceTransformer models, keyed by (model name, quantized), shared by all instances
+_MODEL_CACHE: Dict[tuple, Any] = {}
+
+# Non-empty lines per chunk in build_langchain_index
+CHUNK_LINES = 3
+
+# Collection-level metadata of the LangChain index; per-chunk metadata carries only
+# what varies (source, kind, start_line, end_line)
+INDEX_COLLECTION_METADATA = {"source": "langchain_index", "chunk_type": "smart_line_grouping"}
+
+# Threads reading files for build_langchain_index (pandas/file I/O release the GIL)
+INDEX_LOAD_WORKERS = 8
+
+# Items per collection.upsert call (bounds transaction length and memory)
+CHROMA_ADD_BATCH = 5000
+
+# Chroma server to use instead of the embedded PersistentClient (e.g. `chroma run --path ./chroma_db`);
+# unset keeps the in-process database under chroma_persist_directory
+CHROMA_HOST = os.environ.get("CHROMA_HOST")
+CHROMA_PORT = int(os.environ.get("CHROMA_PORT", "8000"))
+
+# SQLite pragmas applied to Chroma's connection: WAL is safe but much faster to insert into
+SQLITE_PRAGMAS = (
+    "pragma journal_mode = WAL",
+    "pragma synchronous = NORMAL",
+    "pragma temp_store = memory",
+)
+
+# ECS field references recognised in VRL snippets
+ECS_FIELD_PATTERNS = (
+    r'\.source\.ip',
+    r'\.destination\.ip',
+    r'\.host\.name',
+    r'\.user\.name',
+    r'\.event\.(?:kind|category|type|action|severity|description|created)',
+    r'\.observer\.(?:type|vendor|product|hostname)',
+    r'\.log\.(?:level|format|syslog)',
+    r'\.url\.(?:original|path|query|domain)',
+    r'\.http\.(?:request|response)',
+    r'\.network\.(?:source|destination)',
+    r'\.related\.(?:ip|user|hosts)',
+    r'\.event_data\.',
+    r'\.@timestamp',
+)
+
+# All patterns fused into one scan; the lookahead keeps overlapping matches (e.g. .network.source.ip)
+_ECS_FIELD_RE = re.compile("(?=(" + "|".join(ECS_FIELD_PATTERNS) + "))")
+_ECS_FIELD_RE_BYTES = re.compile(_ECS_FIELD_RE.pattern.encode())
+
+# Folders with at least this many .vrl files are scanned in a process pool
+VRL_POOL_MIN_FILES = 64
+
+# Upper bound on that pool's worker processes
+VRL_POOL_MAX_WORKERS = 4
+
+# sourcelist.json arrays at least this large are streamed row by row (needs ijson)
+JSON_STREAM_THRESHOLD = 8 * 1024 * 1024
+
+# Core ECS field definitions embedded into the knowledge base
+ECS_CORE_FIELDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ecs_core_fields.csv")
+
+# Log samples are indexed by their first LOG_SAMPLE_CHARS characters only
+LOG_SAMPLE_CHARS = 500
+
+# Metadata shared by every vrl.json function entry (function_name is added per entry)
+_VRL_META_BASE = {'type': 'vrl_function', 'category': 'parsing', 'format': 'common'}
+
+# chromadb >= 1.0 takes numpy embeddings as-is; older releases only accept nested lists
+_CHROMA_TAKES_NDARRAY = int(getattr(chromadb, "__version__", "0").split(".")[0]) >= 1
+
+# Seconds get_system_status reuses the collection's document count (writes reset it)
+STATUS_COUNT_TTL = 5.0
+
+# Test queries from render_rag_setup remembered per Streamlit session
+RAG_TEST_CACHE_SIZE = 64
+
+# Fields requested from collection.query; distances are skipped when the caller ignores them
+QUERY_INCLUDE = ['documents', 'metadatas', 'distances']
+QUERY_INCLUDE_NO_DISTANCES = ['documents', 'metadatas']
+
+# search_ecs_field metadata filter (passed to Chroma as-is, never mutated)
+_WHERE_ECS = {"type": {"$in": ["ecs_field_mapping", "vrl_snippet"]}}
+
+# search_ecs_field relevance by document type (anything else is 'medium')
+_ECS_RELEVANCE = {'ecs_field_mapping': 'high'}
+
+# log_profile_query terms: profile key and the label put before its value, in query order
+_LOG_PROFILE_QUERY_PARTS = (('log_type', 'log type '), ('log_format', 'format '), ('vendor', 'vendor '), ('product', 'product '))
+
+# build_context_for_log label per document type (unknown types use the default)
+CONTEXT_PREFIXES = {'vrl_snippet': 'VRL Snippet: ', 'ecs_field': 'ECS Field: ', 'log_example': 'Example: '}
+DEFAULT_CONTEXT_PREFIX = 'Reference: '
+
+# Query embeddings / results kept in memory. Results are reused for the same normalized
+# query text; setting a threshold (e.g. 0.97) also reuses them for any query in the same
+# scope whose embedding has at least that cosine similarity
+QUERY_CACHE_SIZE = 1024
+SEMANTIC_CACHE_THRESHOLD = None
+
+
+def _scan_files(directory: str, suffix: str) -> list:
+    """DirEntry objects for the files in directory whose name ends with suffix ([] if it is missing)"""
+    try:
+        with os.scandir(directory) as it:
+            return [entry for entry in it if entry.name.endswith(suffix) and entry.is_file()]
+    except FileNotFoundError:
+        return []
+
+
+@contextlib.contextmanager
+def _mapped(path: str):
+    """Read-only mmap of a file's bytes (empty files, which cannot be mapped, give b"")"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _vrl_snippet_entries(filepath: str) -> List[Dict[str, Any]]:
+    """Knowledge entries for one VRL snippet file: the snippet plus one per ECS field it sets
+
+    Module-level so it can run in a multiprocessing pool.
+    """
+    entries = []
+    filename = os.path.basename(filepath)
+    try:
+        with _mapped(filepath) as data:
+            # Extract ECS fields from the raw bytes for better indexing
+            ecs_fields = list({field.decode() for field in _ECS_FIELD_RE_BYTES.findall(data)})
+            content = data[:].decode('utf-8')
+            
+            # Create main snippet entry
+            entries.append({
+                'content': f'VRL Snippet ({filename}): {content}',
+                'metadata': {
+                    'type': 'vrl_snippet',
+                    'file': filename,
+                    'category': 'parsing',
+                    'format': filename.replace('.vrl', ''),
+                    'ecs_fields_count': len(ecs_fields),
+                    'ecs_fields_str': ', '.join(ecs_fields[:10])  # Limit to first 10 fields
+                }
+            })
+            
+            # Create individual field entries for better searchability
+            field_contexts = CompleteRAGSystem._get_field_contexts_from_vrl(content, ecs_fields)
+            for field in ecs_fields:
+                field_content = field_contexts[field]
+                entries.append({
+                    'content': f'ECS Field {field} in {filename}: {field_content}',
+                    'metadata': {
+                        'type': 'ecs_field_mapping',
+                        'field': field,
+                        'file': filename,
+                        'category': 'field_mapping',
+                        'format': filename.replace('.vrl', '')
+                    }
+                })
+                
+    except Exception as e:
+        logger.warning(f"Could not load VRL snippet {filename}: {e}")
+    return entries
+
+
+class SemanticQueryCache:
+    """Query results reused for the same query text, optionally for near-identical queries too
+
+    Entries are grouped by scope (method, collection, filters, n_results). A
+    lookup hits on the whitespace-normalized query text; with a threshold set,
+    a miss falls back to one matrix-vector product over the scope's embedding
+    matrix (cosine similarity of normalized embeddings).
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, threshold: Optional[float] = SEMANTIC_CACHE_THRESHOLD):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.scopes: Dict[tuple, list] = {}  # scope -> [embedding matrix, slot by query, queries, results, next slot]
+
+    def get(self, scope: tuple, query: str, embedding) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached results for query (or, with a threshold, the most similar query) in scope, or None"""
+        entry = self.scopes.get(scope)
+        if entry is None:
+            return None
+        matrix, slots, _, results, _ = entry
+        slot = slots.get(_query_key(query))
+        if slot is not None:
+            return list(results[slot])
+        if self.threshold is None:
+            return None
+        similarities = matrix[:len(results)] @ embedding
+        best = int(np.argmax(similarities))
+        return list(results[best]) if similarities[best] >= self.threshold else None
+
+    def put(self, scope: tuple, query: str, embedding, result: List[Dict[str, Any]]) -> None:
+        """Store a query result, overwriting the oldest entry of a full scope"""
+        entry = self.scopes.get(scope)
+        if entry is None:
+            entry = self.scopes[scope] = [np.empty((self.max_entries, len(embedding)), dtype=np.float32), {}, [], [], 0]
+        matrix, slots, queries, results, slot = entry
+        key = _query_key(query)
+        if key in slots:
+            slot = slots[key]
+            results[slot] = result
+        else:
+            if slot < len(queries):
+                del slots[queries[slot]]
+                queries[slot] = key
+                results[slot] = result
+            else:
+                queries.append(key)
+                results.append(result)
+            slots[key] = slot
+            entry[4] = (slot + 1) % self.max_entries
+        matrix[slot] = embedding
+
+    def clear(self) -> None:
+        self.scopes.clear()
+
+
+@lru_cache(maxsize=1)
+def _core_ecs_fields() -> tuple:
+    """Core ECS fields table as parallel tuples (contents, field names, categories), read once per process"""
+    table = pd.read_csv(ECS_CORE_FIELDS_PATH, dtype=str, keep_default_na=False)
+    fields = tuple(table['field'])
+    contents = tuple(f'ECS Field: {field} - {description}' for field, description in zip(fields, table['description']))
+    return contents, fields, tuple(table['category'])
+
+
+def _chroma_embeddings(embeddings):
+    """Embeddings in the form the installed chromadb accepts (ndarrays are converted only for < 1.0)"""
+    if isinstance(embeddings, np.ndarray) and not _CHROMA_TAKES_NDARRAY:
+        return embeddings.tolist()
+    return embeddings
+
+
+def _query_key(query: str) -> str:
+    """Whitespace-normalized query used as the embedding cache key"""
+    return " ".join(query.split())
+
+
+def _chunk_ids(source: str, texts: List[str]) -> List[str]:
+    """Content-derived chunk ids, stable across rebuilds: blake2b(source, text), repeats in a file suffixed _n"""
+    ids = []
+    seen: Dict[str, int] = {}
+    for text in texts:
+        digest = hashlib.blake2b(f"{source}\0{text}".encode("utf-8"), digest_size=8).hexdigest()
+        repeat = seen.get(digest, 0)
+        seen[digest] = repeat + 1
+        ids.append(digest if repeat == 0 else f"{digest}_{repeat}")
+    return ids
+
+
 class CompleteRAGSystem:
     """Complete RAG system with embeddings and ChromaDB"""
     
     def __init__(self, 
                  embedding_model_name: str = "all-MiniLM-L6-v2",
                  chroma_persist_directory: str = "./chroma_db",
-                 data_directory: str = "./data"):
+                 data_directory: str = "./data",
+                 use_quantized: bool = False):
         
         self.embedding_model_name = embedding_model_name
+        self.use_quantized = use_quantized
         self.chroma_persist_directory = chroma_persist_directory
         self.data_directory = data_directory
         
@@ -52,6 +322,10 @@ class CompleteRAGSystem:
         self.chroma_client = None
         self.collection = None
         self.vendor_reference = None
+        self._embed_cache: OrderedDict = OrderedDict()
+        self._result_cache = SemanticQueryCache()
+        self._cache_lock = threading.Lock()
+        self._count_cache = None  # (monotonic time, collection, count)
         
         # Create directories
         os.makedirs(chroma_persist_directory, exist_ok=True)
@@ -64,22 +338,40 @@ class CompleteRAGSystem:
                 logger.error("❌ SentenceTransformer not available - install with: pip install sentence-transformers")
                 return False
                 
+            # Reuse a model already loaded in this process with the same settings
+            cache_key = (self.embedding_model_name, self.use_quantized)
+            if cache_key in _MODEL_CACHE:
+                self.embedding_model = _MODEL_CACHE[cache_key]
+                return True
+            
             logger.info(f"Setting up embedding model: {self.embedding_model_name}")
             
+            # GPU + fp16 when available; otherwise CPU (optionally int8-quantized)
+            device = self._embedding_device()
+            
             # Check if model is already downloaded
             model_path = f"./models/{self.embedding_model_name}"
             if os.path.exists(model_path):
                 logger.info(f"Loading existing model from {model_path}")
-                self.embedding_model = SentenceTransformer(model_path)
+                self.embedding_model = SentenceTransformer(model_path, device=device)
             else:
                 logger.info(f"Downloading model: {self.embedding_model_name}")
-                self.embedding_model = SentenceTransformer(self.embedding_model_name)
+                self.embedding_model = SentenceTransformer(self.embedding_model_name, device=device)
                 
                 # Save model locally
                 os.makedirs("./models", exist_ok=True)
                 self.embedding_model.save(model_path)
                 logger.info(f"Model saved to {model_path}")
             
+            if device == "cuda":
+                self.embedding_model.half()
+            else:
+                self.embedding_model = self._maybe_quantize(self.embedding_model)
+            
+            # Warm up (CUDA context, kernel selection, tokenizer) so the first user query doesn't pay for it
+            self.encode_batch(["warmup"])
+            _MODEL_CACHE[cache_key] = self.embedding_model
+            
             logger.info("✅ Embedding model setup complete")
             return True
             
@@ -87,161 +379,379 @@ class CompleteRAGSystem:
             logger.error(f"❌ Failed to setup embedding model: {str(e)}")
             return False
 
+    def _maybe_quantize(self, model):
+        """Apply int8 dynamic quantization to the model's Linear layers if enabled (CPU only)"""
+        if not self.use_quantized:
+            return model
+        if torch is None:
+            logger.warning("use_quantized requested but torch is not available; using fp32 model")
+            return model
+        try:
+            quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            logger.info("Embedding model quantized to int8")
+            return quantized
+        except Exception as e:
+            logger.warning(f"int8 quantization failed, using fp32 model: {e}")
+            return model
+
+    @staticmethod
+    def _embedding_device() -> str:
+        """Device for index-time embedding: cuda if a GPU is usable, else cpu"""
+        return "cuda" if torch is not None and torch.cuda.is_available() else "cpu"
+
+    @staticmethod
+    def _no_grad():
+        """No autograd bookkeeping for inference-only forward passes"""
+        return torch.inference_mode() if torch is not None else contextlib.nullcontext()
+
+    def encode_batch(self, texts: List[str], batch_size: int = 64):
+        """Embed many texts in one vectorized encode call (normalized numpy rows)"""
+        with self._no_grad():
+            return self.embedding_model.encode(
+                texts,
+                batch_size=min(batch_size, max(1, len(texts))),
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+
+    def _embed_query(self, query: str):
+        """Normalized embedding of one query (several at once: _embed_queries)"""
+        key = _query_key(query)
+        with self._cache_lock:
+            embedding = self._embed_cache.get(key)
+            if embedding is not None:
+                self._embed_cache.move_to_end(key)
+                return embedding
+        embedding = self.encode_batch([key])[0]
+        self._remember_embeddings([key], [embedding])
+        return embedding
+
+    def _embed_queries(self, queries: List[str]) -> list:
+        """Normalized embeddings of several queries; only cache misses are encoded (in one call)"""
+        keys = [_query_key(query) for query in queries]
+        with self._cache_lock:
+            embeddings = [self._embed_cache.get(key) for key in keys]
+        misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if misses:
+            encoded = self.encode_batch([keys[i] for i in misses])
+            for i, embedding in zip(misses, encoded):
+                embeddings[i] = embedding
+            self._remember_embeddings([keys[i] for i in misses], encoded)
+        return embeddings
+
+    def _remember_embeddings(self, keys: List[str], embeddings) -> None:
+        with self._cache_lock:
+            for key, embedding in zip(keys, embeddings):
+                self._embed_cache[key] = embedding
+            while len(self._embed_cache) > QUERY_CACHE_SIZE:
+                self._embed_cache.popitem(last=False)
+
+    def _cached_results(self, scope: tuple, query: str, embedding) -> Optional[List[Dict[str, Any]]]:
+        with self._cache_lock:
+            return self._result_cache.get(scope, query, embedding)
+
+    def _cache_results(self, scope: tuple, query: str, embedding, results: List[Dict[str, Any]]) -> None:
+        with self._cache_lock:
+            self._result_cache.put(scope, query, embedding, results)
+
+    def _collection_changed(self) -> None:
+        """Drop cached query results and the cached document count (the collection was replaced or written to)"""
+        with self._cache_lock:
+            self._result_cache.clear()
+        self._count_cache = None
+
+    def _collection_count(self) -> int:
+        """collection.count(), reused for STATUS_COUNT_TTL seconds (each call is a SQLite query)"""
+        collection = self.collection
+        if collection is None:
+            return 0
+        cached = self._count_cache
+        now = time.monotonic()
+        if cached is not None and cached[1] is collection and now - cached[0] < STATUS_COUNT_TTL:
+            return cached[2]
+        count = collection.count()
+        self._count_cache = (now, collection, count)
+        return count
+
     def _iter_index_paths(self) -> Iterable[str]:
         """Yield indexable files under data/ aligned with the tutorial (load → split → embed → store).
 
         Includes: .vrl, .txt, .md, .json, .csv, .xlsx, .xls. Skips large binaries.
         """
         allow_ext = {".vrl", ".txt", ".md", ".json", ".csv", ".xlsx", ".xls"}
-        for root, _dirs, files in os.walk(self.data_directory):
-            for fname in files:
-                ext = os.path.splitext(fname)[1].lower()
-                if ext in allow_ext:
-                    yield os.path.join(root, fname)
+        pending = [self.data_directory]
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in allow_ext:
+                            yield entry.path
+            except OSError:
+                continue
 
-    def build_langchain_index(self) -> bool:
-        """Create a LangChain index (Load → Split → Embed → Store) per v0.3 tutorial
-        using local HuggingFace embeddings and Chroma, then expose the same
-        persisted store through the existing chromadb client.
-        """
-        if not _LC_AVAILABLE:
-            logger.warning("LangChain components not available; skipping LC index build")
-            return False
+    def _data_fingerprint(self) -> str:
+        """Fingerprint of the indexable files (path, size, mtime) used to detect a stale index"""
+        digest = hashlib.blake2b(digest_size=16)
+        for path in sorted(self._iter_index_paths()):
+            stat = os.stat(path)
+            digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()
 
+    def load_persisted_index(self) -> bool:
+        """Open the persisted LangChain index instead of rebuilding it, if it is up to date"""
         try:
-            logger.info("Indexing data with LangChain (load → split → embed → store)...")
+            if not self.chroma_client and not self.setup_chromadb():
+                return False
+            collection = self.chroma_client.get_collection("parser_knowledge_base")
+            metadata = collection.metadata or {}
+            if collection.count() == 0 or metadata.get("data_fingerprint") != self._data_fingerprint():
+                return False
+            self.collection = collection
+            self._collection_changed()
+            logger.info(f"✅ Loaded persisted index with {collection.count()} chunks")
+            return True
+        except Exception as e:
+            logger.debug(f"No reusable persisted index: {e}")
+            return False
 
-            # 1) Load: read all supported files, converting tabular (xlsx/csv) to JSON strings
-            documents = []
-            for path in self._iter_index_paths():
-                try:
-                    ext = os.path.splitext(path)[1].lower()
-                    if ext in {".xlsx", ".xls"}:
-                        # Convert Excel to JSONL-like string for embedding
-                        df = pd.read_excel(path)
-                        df.columns = [str(c).strip() for c in df.columns]
-                        records = df.to_dict(orient="records")
-                        content = json.dumps(records, ensure_ascii=False)
-                        documents.append(Document(page_content=content, metadata={"source": path, "kind": "excel"}))
-                    elif ext == ".csv":
-                        df = pd.read_csv(path)
-                        df.columns = [str(c).strip() for c in df.columns]
-                        records = df.to_dict(orient="records")
-                        content = json.dumps(records, ensure_ascii=False)
-                        documents.append(Document(page_content=content, metadata={"source": path, "kind": "csv"}))
-                    else:
-                        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                            content = f.read()
-                        documents.append(Document(page_content=content, metadata={"source": path, "kind": "text"}))
-                except Exception as e:
-                    logger.debug(f"Skip non-text or unreadable file: {path} ({e})")
-            if not documents:
-                logger.warning("No documents loaded from data/ for indexing (allowed: .vrl,.txt,.md,.json,.csv)")
+    def _load_index_document(self, path: str):
+        """Load one indexable file as (text, metadata) (None if unreadable)"""
+        try:
+            ext = os.path.splitext(path)[1].lower()
+            if ext in {".xlsx", ".xls", ".csv"}:
+                # Convert tabular data to a JSON records string for embedding (one C-level pass)
+                df = pd.read_csv(path) if ext == ".csv" else pd.read_excel(path)
+                df.columns = [str(c).strip() for c in df.columns]
+                content = df.to_json(orient="records", force_ascii=False)
+                kind = "csv" if ext == ".csv" else "excel"
+                return content, {"source": path, "kind": kind}
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                content = f.read()
+            return content, {"source": path, "kind": "text"}
+        except Exception as e:
+            logger.debug(f"Skip non-text or unreadable file: {path} ({e})")
+            return None
 
-            # 2) Split - Smart chunks that understand line-by-line content
-            chunks = []
-            for doc in documents:
-                lines = doc.page_content.split('\n')
-                current_chunk_lines = []
-                current_chunk_start = 0
-                
-                for i, line in enumerate(lines):
-                    line = line.strip()
-                    if not line:  # Skip empty lines
-                        continue
-                    
-                    current_chunk_lines.append(line)
-                    
-                    # Create chunk when we have 3-5 lines or reach end of file
-                    if len(current_chunk_lines) >= 3 or i == len(lines) - 1:
-                        if current_chunk_lines:  # Only create chunk if we have content
-                            chunk_content = '\n'.join(current_chunk_lines)
-                            chunks.append(Document(
-                                page_content=chunk_content,
-                                metadata={
-                                    **doc.metadata, 
-                                    "start_line": current_chunk_start + 1,
-                                    "end_line": current_chunk_start + len(current_chunk_lines),
-                                    "line_count": len(current_chunk_lines),
-                                    "chunk_type": "smart_line_grouping"
-                                }
-                            ))
-                            current_chunk_start = i + 1
-                            current_chunk_lines = []
-            
-            # Process ALL chunks - no limiting for complete coverage
-            logger.info(f"Processing ALL {len(chunks)} chunks for complete knowledge base coverage")
-            
-            logger.info(f"Prepared {len(chunks)} line-by-line chunks for embedding")
+    def build_langchain_index(self) -> bool:
+        """Create the knowledge index (Load → Split → Embed → Store, as in the LangChain
+        v0.3 tutorial) directly on parallel text/metadata lists with the local
+        SentenceTransformer and the existing chromadb client - LangChain itself
+        is not required.
 
-            # 3) Embed (local, free)
-            embeddings = HuggingFaceEmbeddings(model_name=self.embedding_model_name, 
-                                               encode_kwargs={"normalize_embeddings": True})
+        Rebuilds are incremental: only files whose content changed since the
+        last build (per the index manifest) are re-embedded.
+        """
+        try:
+            logger.info("Indexing data (load → split → embed → store)...")
 
-            # 4) Store using direct ChromaDB client (avoid LangChain Chroma conflicts)
-            # Generate embeddings in batches to avoid memory issues
-            batch_size = 1000  # Larger batch size for efficiency with all content
-            embeddings_list = []
-            
-            for i in range(0, len(chunks), batch_size):
-                batch_chunks = chunks[i:i + batch_size]
-                batch_texts = [chunk.page_content for chunk in batch_chunks]
-                batch_embeddings = embeddings.embed_documents(batch_texts)
-                embeddings_list.extend(batch_embeddings)
-                logger.info(f"Processed embedding batch {i//batch_size + 1}/{(len(chunks)-1)//batch_size + 1}")
-            
-            # Add to existing ChromaDB collection
             if not self.chroma_client:
                 self.setup_chromadb()
+
+            # 0) Diff data/ against the manifest of the last build - only changed files are re-embedded
+            previous = self._load_index_manifest()
+            self.collection = self._open_index_collection(reuse=bool(previous))
+            self._collection_changed()
+            if self.collection.count() == 0:
+                previous = {}
+            current, changed = self._scan_index_files(previous)
+            if previous:
+                for path in [path for path in previous if path not in current] + changed:
+                    self.collection.delete(where={"source": path})
+                self._collection_changed()
+            logger.info(f"{len(changed)} of {len(current)} files changed since the last index build")
+
+            # 1) Load: read changed files in parallel, converting tabular (xlsx/csv) to JSON strings
+            with ThreadPoolExecutor(max_workers=INDEX_LOAD_WORKERS) as pool:
+                loaded = [doc for doc in pool.map(self._load_index_document, changed) if doc is not None]
+            if not current:
+                logger.warning("No documents loaded from data/ for indexing (allowed: .vrl,.txt,.md,.json,.csv)")
+
+            # 2) Split - Smart chunks of CHUNK_LINES non-empty lines, keeping original line numbers
+            # Sized from the line count (an upper bound) so slots are filled by index, then trimmed
+            estimate = sum(-(-(content.count('\n') + 1) // CHUNK_LINES) for content, _ in loaded)
+            documents = [None] * estimate
+            metadatas = [None] * estimate
+            ids = [None] * estimate
+            k = 0
+            for content, metadata in loaded:
+                lines = [line.strip() for line in content.split('\n')]
+                kept = [i for i, line in enumerate(lines) if line]
+                groups = [kept[i:i + CHUNK_LINES] for i in range(0, len(kept), CHUNK_LINES)]
+                texts = ['\n'.join(lines[i] for i in group) for group in groups]
+                end = k + len(texts)
+                documents[k:end] = texts
+                metadatas[k:end] = [
+                    {**metadata, "start_line": group[0] + 1, "end_line": group[-1] + 1}
+                    for group in groups
+                ]
+                ids[k:end] = _chunk_ids(metadata["source"], texts)
+                k = end
+            del documents[k:], metadatas[k:], ids[k:]
             
-            # Clear and recreate collection to avoid settings conflicts
-            try:
-                self.chroma_client.delete_collection("parser_knowledge_base")
-            except:
-                pass
-            
-            self.collection = self.chroma_client.create_collection(
-                name="parser_knowledge_base",
-                metadata={"source": "langchain_index"}
-            )
-            
-            # Add documents with embeddings
-            documents = [chunk.page_content for chunk in chunks]
-            metadatas = [chunk.metadata for chunk in chunks]
-            ids = [f"doc_{i}" for i in range(len(chunks))]
-            
-            self.collection.add(
-                documents=documents,
-                metadatas=metadatas,
-                ids=ids,
-                embeddings=embeddings_list
-            )
+            logger.info(f"Prepared {len(documents)} line-by-line chunks for embedding")
+
+            # 3) Embed (local, free) with the shared SentenceTransformer used for queries
+            if documents and self.embedding_model is None and not self.setup_embedding_model():
+                return False
+
+            # 4) Store using direct ChromaDB client
+            # Embed in length order so each batch pads to similar lengths
+            order = sorted(range(len(documents)), key=lambda idx: len(documents[idx]))
+            asyncio.run(self._embed_and_store(order, documents, metadatas, ids))
+            
+            # Recorded only once every chunk is stored (see load_persisted_index)
+            self._save_index_manifest(current)
+            self.collection.modify(metadata={**INDEX_COLLECTION_METADATA, "data_fingerprint": self._data_fingerprint()})
 
             logger.info("✅ LangChain index built and persisted")
             return True
         except Exception as e:
             logger.error(f"❌ LangChain index build failed: {e}")
             return False
+
+    @property
+    def _index_manifest_path(self) -> str:
+        return os.path.join(self.chroma_persist_directory, "index_manifest.json")
+
+    def _load_index_manifest(self) -> Dict[str, Dict[str, Any]]:
+        """Per-file {mtime_ns, size, sha256} from the last build ({} if missing or built with another model)"""
+        try:
+            with open(self._index_manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("embedding_model") != self.embedding_model_name:
+                return {}
+            return manifest.get("files", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index_manifest(self, files: Dict[str, Dict[str, Any]]) -> None:
+        tmp_path = self._index_manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"embedding_model": self.embedding_model_name, "files": files}, f)
+        os.replace(tmp_path, self._index_manifest_path)
+
+    def _open_index_collection(self, reuse: bool):
+        """The LangChain index collection - reopened for an incremental build, else recreated"""
+        if reuse:
+            try:
+                return self.chroma_client.get_collection("parser_knowledge_base")
+            except Exception:
+                pass
+        # Clear and recreate collection to avoid settings conflicts
+        try:
+            self.chroma_client.delete_collection("parser_knowledge_base")
+        except:
+            pass
+        return self.chroma_client.create_collection(
+            name="parser_knowledge_base",
+            metadata=INDEX_COLLECTION_METADATA
+        )
+
+    def _scan_index_files(self, previous: Dict[str, Dict[str, Any]]):
+        """Return (manifest entries for all indexable files, paths whose content changed)
+
+        Files with an unchanged size and mtime are trusted without hashing.
+        """
+        current, changed = {}, []
+        for path in self._iter_index_paths():
+            stat = os.stat(path)
+            entry = previous.get(path)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                current[path] = entry
+                continue
+            with _mapped(path) as data:
+                sha256 = hashlib.sha256(data).hexdigest()
+            current[path] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256}
+            if not entry or entry["sha256"] != sha256:
+                changed.append(path)
+        return current, changed
     
+    async def _embed_and_store(self, order, documents, metadatas, ids, batch_size: int = 1000):
+        """Embed batches (in the given order) while the previous batch is inserted into Chroma"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=2)
+        total = (len(order) - 1) // batch_size + 1
+
+        def embed(texts):
+            return self.encode_batch(texts, batch_size=256)
+
+        def store(batch_order, batch_embeddings):
+            pick = lambda values: [values[idx] for idx in batch_order]
+            self._upsert_in_batches(pick(documents), pick(metadatas), pick(ids), batch_embeddings)
+
+        async def producer():
+            for n, i in enumerate(range(0, len(order), batch_size), 1):
+                batch_order = order[i:i + batch_size]
+                batch_embeddings = await loop.run_in_executor(None, embed, [documents[idx] for idx in batch_order])
+                await queue.put((batch_order, batch_embeddings))
+                logger.info(f"Processed embedding batch {n}/{total}")
+            await queue.put(None)
+
+        async def consumer():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                await loop.run_in_executor(None, store, *item)
+
+        await asyncio.gather(producer(), consumer())
+
+    def _upsert_in_batches(self, documents, metadatas, ids, embeddings):
+        """collection.upsert in CHROMA_ADD_BATCH-sized slices instead of one huge transaction
+
+        The slice size is capped by the client's max_batch_size (chromadb >= 0.4.10
+        rejects larger calls). embeddings may be a contiguous ndarray; on chromadb
+        releases that need lists, rows are converted one slice at a time.
+        """
+        self._collection_changed()
+        batch = min(CHROMA_ADD_BATCH, getattr(self.chroma_client, "max_batch_size", None) or CHROMA_ADD_BATCH)
+        for i in range(0, len(ids), batch):
+            self.collection.upsert(
+                documents=documents[i:i + batch],
+                metadatas=metadatas[i:i + batch],
+                ids=ids[i:i + batch],
+                embeddings=_chroma_embeddings(embeddings[i:i + batch])
+            )
+
+    def _tune_sqlite(self):
+        """Apply SQLITE_PRAGMAS to Chroma's SQLite connection (private API - best effort)"""
+        try:
+            server = getattr(self.chroma_client, "_server", self.chroma_client)
+            conn = server._sysdb._conn_pool.connect()
+            for pragma in SQLITE_PRAGMAS:
+                conn.execute(pragma)
+        except Exception as e:
+            logger.debug(f"SQLite pragmas not applied: {e}")
+
     def setup_chromadb(self):
         """Setup ChromaDB client and collection"""
         try:
             logger.info("Setting up ChromaDB...")
             
-            # Initialize ChromaDB client
-            self.chroma_client = chromadb.PersistentClient(
-                path=self.chroma_persist_directory,
-                settings=Settings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
-                )
+            # Initialize ChromaDB client: a Chroma server when configured, otherwise embedded
+            settings = Settings(
+                anonymized_telemetry=False,
+                allow_reset=True
             )
+            if CHROMA_HOST:
+                logger.info(f"Using Chroma server at {CHROMA_HOST}:{CHROMA_PORT}")
+                self.chroma_client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT, settings=settings)
+            else:
+                self.chroma_client = chromadb.PersistentClient(
+                    path=self.chroma_persist_directory,
+                    settings=settings
+                )
+                self._tune_sqlite()
             
             # Create or get collection
             self.collection = self.chroma_client.get_or_create_collection(
                 name="log_parsing_knowledge",
                 metadata={"description": "Log parsing knowledge base with VRL snippets, ECS fields, and examples"}
             )
+            self._collection_changed()
             
             logger.info("✅ ChromaDB setup complete")
             return True
@@ -250,14 +760,27 @@ class CompleteRAGSystem:
             logger.error(f"❌ Failed to setup ChromaDB: {str(e)}")
             return False
     
-    def load_vendor_reference(self, xlsx_path: str = "data/all.xlsx", json_path: str = "data/all.json") -> bool:
+    def load_vendor_reference(self, xlsx_path: str = "data/all.xlsx", json_path: str = "data/all.json",
+                              parquet_path: str = "data/all.parquet") -> bool:
         """Load vendor/product reference data.
 
         Preferred order: JSON (data/all.json) → XLSX (data/all.xlsx).
         This allows editing the JSON directly and avoids XLSX parser issues in
-        minimal environments.
+        minimal environments. The loaded table is cached as Parquet
+        (data/all.parquet) and read from there while it is newer than both.
         """
         try:
+            sources = [path for path in (json_path, xlsx_path) if os.path.exists(path)]
+            if os.path.exists(parquet_path) and all(
+                os.path.getmtime(parquet_path) >= os.path.getmtime(path) for path in sources
+            ):
+                try:
+                    self.vendor_reference = pd.read_parquet(parquet_path)
+                    logger.info(f"✅ Loaded {len(self.vendor_reference)} vendor references from {parquet_path}")
+                    return True
+                except Exception as cache_err:
+                    logger.debug(f"Could not read vendor Parquet cache: {cache_err}")
+            
             # Prefer JSON if available
             if os.path.exists(json_path):
                 logger.info(f"Loading vendor reference from {json_path}")
@@ -290,6 +813,12 @@ class CompleteRAGSystem:
                     logger.debug(f"Could not export vendor JSON: {export_err}")
             self.vendor_reference.columns = [c.strip().lower() for c in self.vendor_reference.columns]
             
+            # Columnar cache for the next startup (needs pyarrow or fastparquet)
+            try:
+                self.vendor_reference.to_parquet(parquet_path, compression="zstd", index=False)
+            except Exception as cache_err:
+                logger.debug(f"Could not write vendor Parquet cache: {cache_err}")
+            
             logger.info(f"✅ Loaded {len(self.vendor_reference)} vendor references")
             return True
             
@@ -334,15 +863,17 @@ class CompleteRAGSystem:
                 metadatas.append(entry['metadata'])
                 ids.append(f"doc_{i}")
             
-            # Generate embeddings and add to collection
-            embeddings = self.embedding_model.encode(documents).tolist()
+            # Generate embeddings (one contiguous float32 ndarray) and add to collection;
+            # the static ECS field definitions come from an on-disk cache when unchanged
+            ecs_rows = [i for i, metadata in enumerate(metadatas) if metadata.get('type') == 'ecs_field']
+            other_rows = [i for i, metadata in enumerate(metadatas) if metadata.get('type') != 'ecs_field']
+            embeddings = np.empty((len(documents), self.embedding_model.get_sentence_embedding_dimension()), dtype=np.float32)
+            if ecs_rows:
+                embeddings[ecs_rows] = self._cached_ecs_embeddings([documents[i] for i in ecs_rows])
+            if other_rows:
+                embeddings[other_rows] = self.encode_batch([documents[i] for i in other_rows])
             
-            self.collection.add(
-                documents=documents,
-                metadatas=metadatas,
-                ids=ids,
-                embeddings=embeddings
-            )
+            self._upsert_in_batches(documents, metadatas, ids, embeddings)
             
             logger.info(f"✅ Knowledge base created with {len(knowledge_entries)} entries")
             return True
@@ -351,6 +882,28 @@ class CompleteRAGSystem:
             logger.error(f"❌ Failed to create knowledge base: {str(e)}")
             return False
     
+    def _cached_ecs_embeddings(self, texts: List[str]):
+        """Embeddings of the ECS field texts, reused from disk (float32) while texts and model are unchanged"""
+        cache_path = os.path.join(self.chroma_persist_directory, "ecs_fields.npy")
+        digest_path = os.path.join(self.chroma_persist_directory, "ecs_fields.sha")
+        # The dtype is part of the key, so caches written as fp16 by earlier versions are rebuilt
+        digest = hashlib.sha256("\0".join([self.embedding_model_name, "float32"] + texts).encode("utf-8")).hexdigest()
+        try:
+            with open(digest_path, "r", encoding="utf-8") as f:
+                if f.read().strip() == digest:
+                    return np.load(cache_path)
+        except (OSError, ValueError):
+            pass
+        
+        embeddings = self.encode_batch(texts)
+        try:
+            np.save(cache_path, embeddings.astype(np.float32, copy=False))
+            with open(digest_path, "w", encoding="utf-8") as f:
+                f.write(digest)
+        except OSError as e:
+            logger.debug(f"Could not cache ECS field embeddings: {e}")
+        return embeddings
+
     def _get_knowledge_entries(self) -> List[Dict[str, Any]]:
         """Get knowledge base entries from data folder"""
         entries = []
@@ -381,55 +934,26 @@ class CompleteRAGSystem:
         """Load VRL snippets from data/ folder and create field-based indexing"""
         entries = []
         
-        # Load VRL snippets from data/ folder (your actual snippets)
-        for filename in os.listdir(self.data_directory):
-            if filename.endswith('.vrl'):
-                filepath = os.path.join(self.data_directory, filename)
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        
-                        # Extract ECS fields from the VRL content for better indexing
-                        ecs_fields = self._extract_ecs_fields_from_vrl(content)
-                        
-                        # Create main snippet entry
-                        entries.append({
-                            'content': f'VRL Snippet ({filename}): {content}',
-                            'metadata': {
-                                'type': 'vrl_snippet',
-                                'file': filename,
-                                'category': 'parsing',
-                                'format': filename.replace('.vrl', ''),
-                                'ecs_fields_count': len(ecs_fields),
-                                'ecs_fields_str': ', '.join(ecs_fields[:10])  # Limit to first 10 fields
-                            }
-                        })
-                        
-                        # Create individual field entries for better searchability
-                        for field in ecs_fields:
-                            field_content = self._get_field_context_from_vrl(content, field)
-                            entries.append({
-                                'content': f'ECS Field {field} in {filename}: {field_content}',
-                                'metadata': {
-                                    'type': 'ecs_field_mapping',
-                                    'field': field,
-                                    'file': filename,
-                                    'category': 'field_mapping',
-                                    'format': filename.replace('.vrl', '')
-                                }
-                            })
-                            
-                except Exception as e:
-                    logger.warning(f"Could not load VRL snippet {filename}: {e}")
+        # Load VRL snippets from data/ folder (your actual snippets) - in worker processes for large folders
+        paths = [entry.path for entry in _scan_files(self.data_directory, '.vrl')]
+        if len(paths) >= VRL_POOL_MIN_FILES:
+            # spawn, not fork: the UI/Chroma threads are already running in this process
+            workers = min(VRL_POOL_MAX_WORKERS, os.cpu_count() or 1)
+            with multiprocessing.get_context("spawn").Pool(workers) as pool:
+                for file_entries in pool.imap(_vrl_snippet_entries, paths, chunksize=8):
+                    entries.extend(file_entries)
+        else:
+            for filepath in paths:
+                entries.extend(_vrl_snippet_entries(filepath))
         
         # Load snippets.jsonl if it exists
         snippets_file = os.path.join(self.data_directory, "snippets.jsonl")
         if os.path.exists(snippets_file):
             try:
-                with open(snippets_file, 'r') as f:
+                with open(snippets_file, 'rb') as f:
                     for line in f:
                         if line.strip():
-                            snippet = json.loads(line.strip())
+                            snippet = _json_loads(line)
                             entries.append({
                                 'content': f'VRL Snippet: {snippet.get("snippet", "")}',
                                 'metadata': {
@@ -443,6 +967,39 @@ class CompleteRAGSystem:
         
         return entries
 
+    @staticmethod
+    def _iter_json_rows(path: str) -> Iterable[Dict[str, Any]]:
+        """Rows of a JSON document: a top-level list, a dict's "rows"/"items" list, or the dict itself
+
+        Large top-level arrays are streamed one row at a time when ijson is installed.
+        """
+        streamed = 0
+        with open(path, "rb") as f:
+            if ijson is not None and os.fstat(f.fileno()).st_size >= JSON_STREAM_THRESHOLD and f.read(64).lstrip()[:1] == b"[":
+                f.seek(0)
+                try:
+                    for row in ijson.items(f, "item", use_float=True):
+                        yield row
+                        streamed += 1
+                    return
+                except ijson.JSONError:
+                    # e.g. integers beyond 64 bits in the C backend: parse the whole
+                    # document and continue after the rows already yielded
+                    pass
+            f.seek(0)
+            data = _json_loads(f.read())
+
+        # Normalize to list of dicts
+        if isinstance(data, list):
+            yield from data[streamed:]
+        elif isinstance(data, dict):
+            # If dict, try to interpret values as rows
+            rows = data.get("rows") or data.get("items") or []
+            if not isinstance(rows, list):
+                # Fallback: treat top-level dict as single row
+                rows = [data]
+            yield from rows
+
     def _load_source_list_mappings(self) -> List[Dict[str, Any]]:
         """Load observer/log source mappings from data/sourcelist.json and convert to RAG entries.
 
@@ -460,23 +1017,7 @@ class CompleteRAGSystem:
             return entries
 
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            # Normalize to list of dicts
-            rows: List[Dict[str, Any]]
-            if isinstance(data, list):
-                rows = data
-            elif isinstance(data, dict):
-                # If dict, try to interpret values as rows
-                rows = data.get("rows") or data.get("items") or []
-                if not isinstance(rows, list):
-                    # Fallback: treat top-level dict as single row
-                    rows = [data]
-            else:
-                rows = []
-
-            for idx, row in enumerate(rows):
+            for idx, row in enumerate(self._iter_json_rows(path)):
                 # Flexible key accessors
                 def _get(*keys: str) -> Any:
                     for k in keys:
@@ -523,73 +1064,51 @@ class CompleteRAGSystem:
     
     def _extract_ecs_fields_from_vrl(self, vrl_content: str) -> List[str]:
         """Extract ECS fields from VRL content"""
-        import re
-        
-        # Common ECS field patterns
-        ecs_patterns = [
-            r'\.source\.ip',
-            r'\.destination\.ip', 
-            r'\.host\.name',
-            r'\.user\.name',
-            r'\.event\.(?:kind|category|type|action|severity|description|created)',
-            r'\.observer\.(?:type|vendor|product|hostname)',
-            r'\.log\.(?:level|format|syslog)',
-            r'\.url\.(?:original|path|query|domain)',
-            r'\.http\.(?:request|response)',
-            r'\.network\.(?:source|destination)',
-            r'\.related\.(?:ip|user|hosts)',
-            r'\.event_data\.',
-            r'\.@timestamp'
-        ]
-        
-        found_fields = set()
-        for pattern in ecs_patterns:
-            matches = re.findall(pattern, vrl_content)
-            found_fields.update(matches)
-        
-        return list(found_fields)
+        return list(set(_ECS_FIELD_RE.findall(vrl_content)))
     
-    def _get_field_context_from_vrl(self, vrl_content: str, field: str) -> str:
-        """Get context around a specific ECS field in VRL content"""
+    @staticmethod
+    def _get_field_contexts_from_vrl(vrl_content: str, fields: List[str]) -> Dict[str, str]:
+        """Context (2 lines before and after its first occurrence) for each ECS field, in one pass over the lines"""
         lines = vrl_content.split('\n')
-        context_lines = []
-        
+        first_line = {}
+        pending = set(fields)
         for i, line in enumerate(lines):
-            if field in line:
-                # Get context (2 lines before and after)
-                start = max(0, i - 2)
-                end = min(len(lines), i + 3)
-                context_lines.extend(lines[start:end])
+            if not pending:
                 break
+            found = [field for field in pending if field in line]
+            for field in found:
+                first_line[field] = i
+            pending.difference_update(found)
         
-        return '\n'.join(context_lines)
+        return {
+            field: '\n'.join(lines[max(0, first_line[field] - 2):first_line[field] + 3]) if field in first_line else ''
+            for field in fields
+        }
     
     def _load_reference_examples(self) -> List[Dict[str, Any]]:
         """Load reference examples from data/reference_examples folder"""
         entries = []
         ref_examples_dir = os.path.join(self.data_directory, "reference_examples")
         
-        if os.path.exists(ref_examples_dir):
-            for filename in os.listdir(ref_examples_dir):
-                if filename.endswith('.vrl'):
-                    filepath = os.path.join(ref_examples_dir, filename)
-                    try:
-                        with open(filepath, 'r') as f:
-                            content = f.read()
-                            # Extract vendor/product from filename
-                            vendor_product = filename.replace('_professional.vrl', '').replace('.vrl', '')
-                            entries.append({
-                                'content': f'Reference VRL Example ({vendor_product}): {content}',
-                                'metadata': {
-                                    'type': 'reference_example',
-                                    'file': filename,
-                                    'vendor': vendor_product.split('_')[0] if '_' in vendor_product else vendor_product,
-                                    'product': vendor_product,
-                                    'category': 'reference'
-                                }
-                            })
-                    except Exception as e:
-                        logger.warning(f"Could not load reference example {filename}: {e}")
+        for entry in _scan_files(ref_examples_dir, '.vrl'):
+            filename, filepath = entry.name, entry.path
+            try:
+                with _mapped(filepath) as data:
+                    content = data[:].decode('utf-8')
+                    # Extract vendor/product from filename
+                    vendor_product = filename.replace('_professional.vrl', '').replace('.vrl', '')
+                    entries.append({
+                        'content': f'Reference VRL Example ({vendor_product}): {content}',
+                        'metadata': {
+                            'type': 'reference_example',
+                            'file': filename,
+                            'vendor': vendor_product.split('_')[0] if '_' in vendor_product else vendor_product,
+                            'product': vendor_product,
+                            'category': 'reference'
+                        }
+                    })
+            except Exception as e:
+                logger.warning(f"Could not load reference example {filename}: {e}")
         
         return entries
     
@@ -598,26 +1117,25 @@ class CompleteRAGSystem:
         entries = []
         log_samples_dir = os.path.join(self.data_directory, "log_samples")
         
-        if os.path.exists(log_samples_dir):
-            for filename in os.listdir(log_samples_dir):
-                if filename.endswith('.txt'):
-                    filepath = os.path.join(log_samples_dir, filename)
-                    try:
-                        with open(filepath, 'r') as f:
-                            content = f.read()
-                            # Extract vendor from filename
-                            vendor = filename.replace('.txt', '').replace('_', ' ').title()
-                            entries.append({
-                                'content': f'Log Sample ({vendor}): {content[:500]}...',
-                                'metadata': {
-                                    'type': 'log_sample',
-                                    'file': filename,
-                                    'vendor': vendor,
-                                    'category': 'sample'
-                                }
-                            })
-                    except Exception as e:
-                        logger.warning(f"Could not load log sample {filename}: {e}")
+        for entry in _scan_files(log_samples_dir, '.txt'):
+            filename, filepath = entry.name, entry.path
+            try:
+                with _mapped(filepath) as data:
+                    # Only the head is indexed - decode at most 4 bytes per kept character
+                    content = data[:LOG_SAMPLE_CHARS * 4].decode('utf-8', 'ignore')
+                    # Extract vendor from filename
+                    vendor = filename.replace('.txt', '').replace('_', ' ').title()
+                    entries.append({
+                        'content': f'Log Sample ({vendor}): {content[:LOG_SAMPLE_CHARS]}...',
+                        'metadata': {
+                            'type': 'log_sample',
+                            'file': filename,
+                            'vendor': vendor,
+                            'category': 'sample'
+                        }
+                    })
+            except Exception as e:
+                logger.warning(f"Could not load log sample {filename}: {e}")
         
         return entries
     
@@ -629,63 +1147,12 @@ class CompleteRAGSystem:
         vrl_functions = self._load_vrl_functions()
         entries.extend(vrl_functions)
         
-        # Add comprehensive ECS field mappings
-        ecs_fields = [
-            # Core fields
-            {'content': 'ECS Field: @timestamp - Event timestamp in ISO format', 'metadata': {'type': 'ecs_field', 'field': '@timestamp', 'category': 'core'}},
-            {'content': 'ECS Field: event.original - Original log message', 'metadata': {'type': 'ecs_field', 'field': 'event.original', 'category': 'event'}},
-            {'content': 'ECS Field: event.created - Event creation timestamp', 'metadata': {'type': 'ecs_field', 'field': 'event.created', 'category': 'event'}},
-            {'content': 'ECS Field: event.category - Event category (authentication, network, etc.)', 'metadata': {'type': 'ecs_field', 'field': 'event.category', 'category': 'event'}},
-            {'content': 'ECS Field: event.action - Event action (login, logout, etc.)', 'metadata': {'type': 'ecs_field', 'field': 'event.action', 'category': 'event'}},
-            {'content': 'ECS Field: event.outcome - Event outcome (success, failure)', 'metadata': {'type': 'ecs_field', 'field': 'event.outcome', 'category': 'event'}},
-            
-            # Source/Destination
-            {'content': 'ECS Field: source.ip - Source IP address', 'metadata': {'type': 'ecs_field', 'field': 'source.ip', 'category': 'source'}},
-            {'content': 'ECS Field: source.port - Source port number', 'metadata': {'type': 'ecs_field', 'field': 'source.port', 'category': 'source'}},
-            {'content': 'ECS Field: source.domain - Source domain name', 'metadata': {'type': 'ecs_field', 'field': 'source.domain', 'category': 'source'}},
-            {'content': 'ECS Field: destination.ip - Destination IP address', 'metadata': {'type': 'ecs_field', 'field': 'destination.ip', 'category': 'destination'}},
-            {'content': 'ECS Field: destination.port - Destination port number', 'metadata': {'type': 'ecs_field', 'field': 'destination.port', 'category': 'destination'}},
-            {'content': 'ECS Field: destination.domain - Destination domain name', 'metadata': {'type': 'ecs_field', 'field': 'destination.domain', 'category': 'destination'}},
-            
-            # User
-            {'content': 'ECS Field: user.name - Username', 'metadata': {'type': 'ecs_field', 'field': 'user.name', 'category': 'user'}},
-            {'content': 'ECS Field: user.id - User ID', 'metadata': {'type': 'ecs_field', 'field': 'user.id', 'category': 'user'}},
-            {'content': 'ECS Field: user.email - User email address', 'metadata': {'type': 'ecs_field', 'field': 'user.email', 'category': 'user'}},
-            
-            # Host
-            {'content': 'ECS Field: host.name - Hostname or IP address', 'metadata': {'type': 'ecs_field', 'field': 'host.name', 'category': 'host'}},
-            {'content': 'ECS Field: host.ip - Host IP address', 'metadata': {'type': 'ecs_field', 'field': 'host.ip', 'category': 'host'}},
-            {'content': 'ECS Field: host.os.name - Operating system name', 'metadata': {'type': 'ecs_field', 'field': 'host.os.name', 'category': 'host'}},
-            
-            # Process
-            {'content': 'ECS Field: process.name - Process name', 'metadata': {'type': 'ecs_field', 'field': 'process.name', 'category': 'process'}},
-            {'content': 'ECS Field: process.pid - Process ID', 'metadata': {'type': 'ecs_field', 'field': 'process.pid', 'category': 'process'}},
-            {'content': 'ECS Field: process.command_line - Process command line', 'metadata': {'type': 'ecs_field', 'field': 'process.command_line', 'category': 'process'}},
-            
-            # Network
-            {'content': 'ECS Field: network.protocol - Network protocol (tcp, udp, etc.)', 'metadata': {'type': 'ecs_field', 'field': 'network.protocol', 'category': 'network'}},
-            {'content': 'ECS Field: network.transport - Network transport (tcp, udp)', 'metadata': {'type': 'ecs_field', 'field': 'network.transport', 'category': 'network'}},
-            {'content': 'ECS Field: network.bytes - Network bytes transferred', 'metadata': {'type': 'ecs_field', 'field': 'network.bytes', 'category': 'network'}},
-            
-            # HTTP
-            {'content': 'ECS Field: http.request.method - HTTP request method', 'metadata': {'type': 'ecs_field', 'field': 'http.request.method', 'category': 'http'}},
-            {'content': 'ECS Field: http.request.url - HTTP request URL', 'metadata': {'type': 'ecs_field', 'field': 'http.request.url', 'category': 'http'}},
-            {'content': 'ECS Field: http.response.status_code - HTTP response status code', 'metadata': {'type': 'ecs_field', 'field': 'http.response.status_code', 'category': 'http'}},
-            
-            # Observer
-            {'content': 'ECS Field: observer.vendor - Observer vendor name', 'metadata': {'type': 'ecs_field', 'field': 'observer.vendor', 'category': 'observer'}},
-            {'content': 'ECS Field: observer.product - Observer product name', 'metadata': {'type': 'ecs_field', 'field': 'observer.product', 'category': 'observer'}},
-            {'content': 'ECS Field: observer.type - Observer type (firewall, proxy, etc.)', 'metadata': {'type': 'ecs_field', 'field': 'observer.type', 'category': 'observer'}},
-            
-            # Related
-            {'content': 'ECS Field: related.ip - Related IP addresses', 'metadata': {'type': 'ecs_field', 'field': 'related.ip', 'category': 'related'}},
-            {'content': 'ECS Field: related.user - Related usernames', 'metadata': {'type': 'ecs_field', 'field': 'related.user', 'category': 'related'}},
-            
-            # Message
-            {'content': 'ECS Field: message - Log message content', 'metadata': {'type': 'ecs_field', 'field': 'message', 'category': 'message'}},
-        ]
-        
-        entries.extend(ecs_fields)
+        # Add comprehensive ECS field mappings (field, description, category table shipped with the app)
+        contents, fields, categories = _core_ecs_fields()
+        entries.extend(
+            {'content': content, 'metadata': {'type': 'ecs_field', 'field': field, 'category': category}}
+            for content, field, category in zip(contents, fields, categories)
+        )
         return entries
     
     def _load_vrl_functions(self) -> List[Dict[str, Any]]:
@@ -695,181 +1162,190 @@ class CompleteRAGSystem:
         
         if os.path.exists(vrl_json_path):
             try:
-                with open(vrl_json_path, 'r') as f:
-                    vrl_functions = json.load(f)
+                with open(vrl_json_path, 'rb') as f:
+                    vrl_functions = _json_loads(f.read())
                 
                 for func in vrl_functions:
                     function_name = func.get('function_name', '')
-                    description = func.get('description', '')
-                    function_spec = func.get('function_spec', '')
                     
                     # Create comprehensive entry
-                    content = f"VRL Function: {function_name} - {description}\nSpecification: {function_spec}"
+                    content = "VRL Function: %s - %s\nSpecification: %s" % (
+                        function_name, func.get('description', ''), func.get('function_spec', '')
+                    )
+                    metadata = _VRL_META_BASE.copy()
+                    metadata['function_name'] = function_name
                     
-                    entries.append({
-                        'content': content,
-                        'metadata': {
-                            'type': 'vrl_function',
-                            'function_name': function_name,
-                            'category': 'parsing',
-                            'format': 'common'
-                        }
-                    })
+                    entries.append({'content': content, 'metadata': metadata})
                     
             except Exception as e:
                 logger.warning(f"Could not load vrl.json: {e}")
         
         return entries
     
-    def query_rag(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
-        """Query the RAG system"""
+    def query_rag(self, query: str, n_results: int = 5, with_distances: bool = True) -> List[Dict[str, Any]]:
+        """Query the RAG system (with_distances=False leaves 'distance' as None)"""
+        collection = self.collection
+        if collection is None or self.embedding_model is None:
+            logger.error("❌ RAG query failed: RAG system not initialized")
+            return []
+        
+        scope = ("query_rag", id(collection), n_results, with_distances)
         try:
-            if not self.embedding_model or not self.collection:
-                raise Exception("RAG system not initialized")
-            
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode([query]).tolist()[0]
-            
-            # Query ChromaDB
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                include=['documents', 'metadatas', 'distances']
+            query_embedding, cached, results = self._embed_and_query(
+                collection, scope, query, n_results,
+                include=QUERY_INCLUDE if with_distances else QUERY_INCLUDE_NO_DISTANCES
             )
-            
-            # Format results
-            formatted_results = []
-            for i in range(len(results['documents'][0])):
-                formatted_results.append({
-                    'content': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
-                    'distance': results['distances'][0][i]
-                })
-            
-            return formatted_results
-            
         except Exception as e:
             logger.error(f"❌ RAG query failed: {str(e)}")
             return []
+        if cached is not None:
+            return cached
+        
+        formatted_results = self._format_results(results, 0)
+        self._cache_results(scope, query, query_embedding, formatted_results)
+        return formatted_results
+    
+    def query_rag_many(self, queries: List[str], n_results: int = 5) -> List[List[Dict[str, Any]]]:
+        """Query the RAG system for several queries with one encode and one ChromaDB call"""
+        collection = self.collection
+        if collection is None or self.embedding_model is None:
+            logger.error("❌ RAG query failed: RAG system not initialized")
+            return [[] for _ in queries]
+        if not queries:
+            return []
+        
+        scope = ("query_rag", id(collection), n_results, True)
+        try:
+            embeddings = self._embed_queries(queries)
+            answers = [self._cached_results(scope, query, embedding) for query, embedding in zip(queries, embeddings)]
+            misses = [i for i, answer in enumerate(answers) if answer is None]
+            if not misses:
+                return answers
+            results = collection.query(
+                query_embeddings=_chroma_embeddings(np.stack([embeddings[i] for i in misses])),
+                n_results=n_results,
+                include=QUERY_INCLUDE
+            )
+        except Exception as e:
+            logger.error(f"❌ RAG query failed: {str(e)}")
+            return [[] for _ in queries]
+        
+        for row, i in enumerate(misses):
+            answers[i] = self._format_results(results, row)
+            self._cache_results(scope, queries[i], embeddings[i], answers[i])
+        return answers
+    
+    def _embed_and_query(self, collection, scope: tuple, query: str, n_results: int, **query_kwargs):
+        """Shared search path: embed query, then collection.query
+
+        Cached results for the query in scope short-circuit the Chroma call.
+        Returns (query_embedding, cached formatted results or None, raw query results or None).
+        """
+        query_embedding = self._embed_query(query)
+        cached = self._cached_results(scope, query, query_embedding)
+        if cached is not None:
+            return query_embedding, cached, None
+        results = collection.query(
+            query_embeddings=_chroma_embeddings(query_embedding.reshape(1, -1)),
+            n_results=n_results,
+            **query_kwargs
+        )
+        return query_embedding, None, results
+    
+    @staticmethod
+    def _format_results(results: Dict[str, Any], row: int) -> List[Dict[str, Any]]:
+        """content/metadata/distance dicts for one query row of a collection.query result"""
+        documents = results['documents'][row]
+        distances = results['distances'][row] if results.get('distances') else [None] * len(documents)
+        return [
+            {'content': content, 'metadata': metadata, 'distance': distance}
+            for content, metadata, distance in zip(documents, results['metadatas'][row], distances)
+        ]
     
     def search_ecs_field(self, field_name: str, n_results: int = 5) -> List[Dict[str, Any]]:
         """Search for specific ECS field mappings"""
+        collection = self.collection
+        if collection is None or self.embedding_model is None:
+            logger.error("❌ ECS field search failed: RAG system not initialized")
+            return []
+        
+        # Results are filtered on field_name, so it is part of the cache scope
+        scope = ("search_ecs_field", id(collection), field_name, n_results)
+        # Field-specific query; only documents that mention the field are ranked
+        field_query = f"ECS field {field_name} mapping VRL"
         try:
-            if not self.embedding_model or not self.collection:
-                raise Exception("RAG system not initialized")
-            
-            # Create field-specific query
-            field_query = f"ECS field {field_name} mapping VRL"
-            
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode([field_query]).tolist()[0]
-            
-            # Query ChromaDB with field-specific filtering
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                include=['documents', 'metadatas', 'distances'],
-                where={"type": {"$in": ["ecs_field_mapping", "vrl_snippet"]}}
+            query_embedding, cached, results = self._embed_and_query(
+                collection, scope, field_query, n_results,
+                include=QUERY_INCLUDE,
+                where=_WHERE_ECS,
+                where_document={"$contains": field_name}
             )
-            
-            # Format results
-            formatted_results = []
-            for i in range(len(results['documents'][0])):
-                metadata = results['metadatas'][0][i]
-                # Prioritize results that contain the specific field
-                if field_name in results['documents'][0][i]:
-                    formatted_results.append({
-                        'content': results['documents'][0][i],
-                        'metadata': metadata,
-                        'distance': results['distances'][0][i],
-                        'relevance': 'high' if metadata.get('type') == 'ecs_field_mapping' else 'medium'
-                    })
-            
-            # Sort by relevance and distance
-            formatted_results.sort(key=lambda x: (x['relevance'] == 'high', -x['distance']))
-            
-            return formatted_results
-            
         except Exception as e:
             logger.error(f"❌ ECS field search failed: {str(e)}")
             return []
+        if cached is not None:
+            return cached
+        
+        # Format results: high-relevance rows first, each group nearest first
+        # (Chroma returns rows ordered by distance, so a stable partition keeps that order)
+        high, medium = [], []
+        for result in self._format_results(results, 0):
+            relevance = _ECS_RELEVANCE.get(result['metadata'].get('type'), 'medium')
+            (high if relevance == 'high' else medium).append({**result, 'relevance': relevance})
+        formatted_results = high + medium
+        
+        self._cache_results(scope, field_query, query_embedding, formatted_results)
+        return formatted_results
     
     def search_vrl_snippets(self, query: str, format_type: str = None, n_results: int = 5) -> List[Dict[str, Any]]:
         """Search VRL snippets with optional format filtering"""
+        collection = self.collection
+        if collection is None or self.embedding_model is None:
+            logger.error("❌ VRL snippet search failed: RAG system not initialized")
+            return []
+        
+        # Build where clause
+        where_clause = {"type": "vrl_snippet"}
+        if format_type:
+            where_clause["format"] = format_type
+        
+        scope = ("search_vrl_snippets", id(collection), format_type, n_results)
         try:
-            if not self.embedding_model or not self.collection:
-                raise Exception("RAG system not initialized")
-            
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode([query]).tolist()[0]
-            
-            # Build where clause
-            where_clause = {"type": "vrl_snippet"}
-            if format_type:
-                where_clause["format"] = format_type
-            
-            # Query ChromaDB
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                include=['documents', 'metadatas', 'distances'],
-                where=where_clause
+            query_embedding, cached, results = self._embed_and_query(
+                collection, scope, query, n_results,
+                include=QUERY_INCLUDE, where=where_clause
             )
-            
-            # Format results
-            formatted_results = []
-            for i in range(len(results['documents'][0])):
-                formatted_results.append({
-                    'content': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
-                    'distance': results['distances'][0][i]
-                })
-            
-            return formatted_results
-            
         except Exception as e:
             logger.error(f"❌ VRL snippet search failed: {str(e)}")
             return []
+        if cached is not None:
+            return cached
+        
+        formatted_results = self._format_results(results, 0)
+        self._cache_results(scope, query, query_embedding, formatted_results)
+        return formatted_results
+    
+    @staticmethod
+    def log_profile_query(log_profile: Dict[str, Any]) -> str:
+        """RAG query text for a log profile (log type, format, vendor, product)"""
+        return " ".join(
+            f"{label}{value}" for key, label in _LOG_PROFILE_QUERY_PARTS if (value := log_profile.get(key))
+        )
     
     def build_context_for_log(self, log_profile: Dict[str, Any]) -> str:
         """Build context for a log profile using RAG"""
         try:
             # Create query from log profile
-            query_parts = []
-            if log_profile.get('log_type'):
-                query_parts.append(f"log type {log_profile['log_type']}")
-            if log_profile.get('log_format'):
-                query_parts.append(f"format {log_profile['log_format']}")
-            if log_profile.get('vendor'):
-                query_parts.append(f"vendor {log_profile['vendor']}")
-            if log_profile.get('product'):
-                query_parts.append(f"product {log_profile['product']}")
-            
-            query = " ".join(query_parts)
+            query = self.log_profile_query(log_profile)
             
             # Query RAG system
-            results = self.query_rag(query, n_results=10)
-            
-            # Build context
-            context_parts = []
-            for result in results:
-                content = result['content']
-                metadata = result['metadata']
-                
-                # Safe key access with fallback
-                doc_type = metadata.get('type', 'unknown')
-                
-                if doc_type == 'vrl_snippet':
-                    context_parts.append(f"VRL Snippet: {content}")
-                elif doc_type == 'ecs_field':
-                    context_parts.append(f"ECS Field: {content}")
-                elif doc_type == 'log_example':
-                    context_parts.append(f"Example: {content}")
-                else:
-                    # Fallback for unknown types
-                    context_parts.append(f"Reference: {content}")
+            results = self.query_rag(query, n_results=10, with_distances=False)
             
-            return "\n".join(context_parts)
+            # Build context, labelling each result by its document type
+            return "\n".join(
+                CONTEXT_PREFIXES.get(result['metadata'].get('type'), DEFAULT_CONTEXT_PREFIX) + result['content']
+                for result in results
+            )
             
         except Exception as e:
             logger.error(f"❌ Context building failed: {str(e)}")
@@ -912,42 +1388,36 @@ class CompleteRAGSystem:
             'chromadb': self.chroma_client is not None,
             'collection': self.collection is not None,
             'vendor_reference': self.vendor_reference is not None,
-            'knowledge_base_size': self.collection.count() if self.collection else 0
+            'knowledge_base_size': self._collection_count()
         }
         return status
     
     def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
         """General search method for the RAG system"""
+        collection = self.collection
+        if collection is None or self.embedding_model is None:
+            logger.warning("RAG system not properly initialized")
+            return []
+        
+        scope = ("search", id(collection), k)
         try:
-            if not self.embedding_model or not self.collection:
-                logger.warning("RAG system not properly initialized")
-                return []
-            
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode([query])
-            
-            # Search the collection
-            results = self.collection.query(
-                query_embeddings=query_embedding.tolist(),
-                n_results=k,
-                include=['documents', 'metadatas', 'distances']
+            query_embedding, cached, results = self._embed_and_query(
+                collection, scope, query, k, include=QUERY_INCLUDE
             )
-            
-            # Format results
-            formatted_results = []
-            if results['documents'] and results['documents'][0]:
-                for i, doc in enumerate(results['documents'][0]):
-                    formatted_results.append({
-                        'page_content': doc,
-                        'metadata': results['metadatas'][0][i] if results['metadatas'] and results['metadatas'][0] else {},
-                        'distance': results['distances'][0][i] if results['distances'] and results['distances'][0] else 0.0
-                    })
-            
-            return formatted_results
-            
         except Exception as e:
             logger.error(f"Search failed: {str(e)}")
             return []
+        if cached is not None:
+            return cached
+        
+        # Format results
+        formatted_results = [
+            {'page_content': result['content'], 'metadata': result['metadata'], 'distance': result['distance']}
+            for result in self._format_results(results, 0)
+        ]
+        
+        self._cache_results(scope, query, query_embedding, formatted_results)
+        return formatted_results
 
 
 # Streamlit integration
@@ -998,7 +1468,19 @@ def render_rag_setup():
         test_query = st.text_input("Test Query", "Cisco ASA syslog parsing")
         
         if st.button("🔍 Query RAG"):
-            results = rag_system.query_rag(test_query, n_results=3)
+            # Repeated clicks on the same query reuse this session's results while the knowledge base is unchanged
+            cache = st.session_state.setdefault("_rag_test_cache", OrderedDict())
+            key = (hashlib.blake2b(test_query.encode("utf-8"), digest_size=8).hexdigest(), 3, status['knowledge_base_size'])
+            results = cache.get(key)
+            if results is None:
+                results = rag_system.query_rag(test_query, n_results=3)
+                # Empty results may be a transient query failure - retry those next click
+                if results:
+                    cache[key] = results
+                    while len(cache) > RAG_TEST_CACHE_SIZE:
+                        cache.popitem(last=False)
+            else:
+                cache.move_to_end(key)
             
             if results:
                 st.success(f"Found {len(results)} relevant results:")
@@ -16,6 +16,10 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from enhanced_docker_validator import EnhancedDockerValidator
 
 
+# The remap `source: |` block of the Vector config, up to the sinks section
+_SOURCE_SECTION_RE = re.compile(r'source: \|.*?(?=sinks:)', re.DOTALL)
+
+
 class Agent03_DockerValidator:
     """Agent03: Validates VRL code using Docker and Vector CLI with comprehensive feedback"""
     
@@ -97,13 +101,10 @@ class Agent03_DockerValidator:
         .event.created = now()
       }}"""
             
-            # Replace the source section
-            updated_config = re.sub(
-                r'source: \|.*?(?=sinks:)',
-                f'source: |\n{vrl_section}\n',
-                config_content,
-                flags=re.DOTALL
-            )
+            # Replace the source section; a callable replacement keeps
+            # backslashes in VRL regexes literal
+            replacement = f'source: |\n{vrl_section}\n'
+            updated_config = _SOURCE_SECTION_RE.sub(lambda _: replacement, config_content)
             
             # Write updated config
             with open(self.config_path, 'w') as f:
@@ -9,6 +9,14 @@ from typing import Dict, Any, List, Tuple, Optional
 from dataclasses import dataclass
 
 
+# VRL assignments of the form `.field.path = value`
+_ECS_ASSIGNMENT_RE = re.compile(r'\.([a-z_]+(?:\.[a-z_]+)*)\s*=\s*([^;\n]+)')
+# Quote characters stripped from either end of an assigned value
+_QUOTES = ('"', "'")
+# ECS naming convention: lowercase words with underscores, joined by dots
+_ECS_NAME_RE = re.compile(r'^[a-z_]+(\.[a-z_]+)*$')
+
+
 @dataclass
 class MappingIssue:
     """Represents a mapping issue found in VRL"""
@@ -106,12 +114,13 @@ class Agent04_MappingChecker:
         mappings = {}
         
         # Look for ECS field assignments
-        ecs_pattern = r'\.([a-z_]+(?:\.[a-z_]+)*)\s*=\s*([^;\n]+)'
-        matches = re.findall(ecs_pattern, vrl_code)
-        
-        for field, value in matches:
-            # Clean up the value (remove quotes, etc.)
-            clean_value = re.sub(r'^["\']|["\']$', '', value.strip())
+        for field, value in _ECS_ASSIGNMENT_RE.findall(vrl_code):
+            # Clean up the value (remove one leading and one trailing quote)
+            clean_value = value.strip()
+            if clean_value.startswith(_QUOTES):
+                clean_value = clean_value[1:]
+            if clean_value.endswith(_QUOTES):
+                clean_value = clean_value[:-1]
             mappings[field] = clean_value
         
         return mappings
@@ -206,10 +215,11 @@ class Agent04_MappingChecker:
     def _check_ecs_compliance(self, mappings: Dict[str, str]) -> List[MappingIssue]:
         """Check ECS schema compliance"""
         issues = []
+        ecs_prefixes = tuple(self.ecs_priority_fields)
         
         for field in mappings.keys():
             # Check if field follows ECS naming conventions
-            if not re.match(r'^[a-z_]+(\.[a-z_]+)*$', field):
+            if not _ECS_NAME_RE.match(field):
                 issues.append(MappingIssue(
                     issue_type="ecs_violation",
                     field_name=field,
@@ -219,7 +229,7 @@ class Agent04_MappingChecker:
                 ))
             
             # Check for non-standard field names that should be in event_data
-            if not any(field.startswith(prefix) for prefix in self.ecs_priority_fields.keys()):
+            if not field.startswith(ecs_prefixes):
                 if not field.startswith('event_data.'):
                     issues.append(MappingIssue(
                         issue_type="ecs_violation",
@@ -250,8 +260,9 @@ class Agent04_MappingChecker:
                 base_score -= 2
         
         # Bonus for ECS compliance
+        ecs_prefixes = tuple(self.ecs_priority_fields)
         ecs_fields = sum(1 for field in mappings.keys() 
-                        if any(field.startswith(prefix) for prefix in self.ecs_priority_fields.keys()))
+                        if field.startswith(ecs_prefixes))
         if ecs_fields > 0:
             base_score += min(ecs_fields * 3, 30)  # Max 30 bonus points
         
@@ -262,8 +273,9 @@ class Agent04_MappingChecker:
         if not mappings:
             return 0.0
         
+        ecs_prefixes = tuple(self.ecs_priority_fields)
         ecs_fields = sum(1 for field in mappings.keys() 
-                        if any(field.startswith(prefix) for prefix in self.ecs_priority_fields.keys()))
+                        if field.startswith(ecs_prefixes))
         
         return (ecs_fields / len(mappings)) * 100
     
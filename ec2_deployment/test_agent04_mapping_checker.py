@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test Agent04 field mapping extraction
+"""
+
+import random
+import re
+
+from agent04_mapping_checker import Agent04_MappingChecker, _ECS_ASSIGNMENT_RE
+
+PIECES = ['.', 'source', '.ip', '_', 'Event', ' ', '\t', '=', '==', ';', '\n', '"', "'", '""',
+          'to_string!(.x)', '10.0.0.1', 'a', '9']
+
+
+def original_extract_field_mappings(vrl_code):
+    """_extract_field_mappings with the per-match quote-stripping regex"""
+    mappings = {}
+    for field, value in _ECS_ASSIGNMENT_RE.findall(vrl_code):
+        mappings[field] = re.sub(r'^["\']|["\']$', '', value.strip())
+    return mappings
+
+
+def test_extracts_assignments():
+    """Fields map to their assigned values with one pair of quotes removed"""
+    vrl = '.event.kind = "event"\n.source.ip = .event_data.src;\n.message = \'\'quoted\'\'\n'
+    assert Agent04_MappingChecker()._extract_field_mappings(vrl) == {
+        "event.kind": "event",
+        "source.ip": ".event_data.src",
+        "message": "'quoted'",
+    }
+
+
+def test_matches_original_implementation():
+    """Random VRL-like text yields the same mappings as the regex quote strip"""
+    checker = Agent04_MappingChecker()
+    rng = random.Random(0)
+    for _ in range(50000):
+        vrl = "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 16)))
+        assert checker._extract_field_mappings(vrl) == original_extract_field_mappings(vrl), repr(vrl)
+
+
+if __name__ == "__main__":
+    test_extracts_assignments()
+    test_matches_original_implementation()
+    print("✅ Agent04 mapping extraction tests passed")
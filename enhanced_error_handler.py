@@ -6,9 +6,107 @@ Handles Docker validation errors and regenerates VRL code with error context
 
 import re
 import os
-from typing import Dict, Any, List
+import hashlib
+import random
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable
 from enhanced_openrouter_agent import EnhancedOpenRouterAgent
 
+# Optional Hyperscan for matching all error patterns in one pass
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+# Common VRL error patterns and fixes, in priority order
+VRL_ERROR_PATTERNS = {
+    r"call to undefined variable\s+`(\w+)`": {
+        "description": "Undefined variable error",
+        "common_fixes": [
+            "Check if variable is properly declared",
+            "Use correct VRL syntax for variable access",
+            "Ensure proper field mapping syntax"
+        ]
+    },
+    r"`exit` reported as used": {
+        "description": "Invalid exit statement",
+        "common_fixes": [
+            "Replace 'exit' with 'return'",
+            "Remove exit statement if not needed",
+            "Use proper VRL flow control"
+        ]
+    },
+    r"missing function argument": {
+        "description": "Missing function argument",
+        "common_fixes": [
+            "Provide required arguments to function",
+            "Check function signature",
+            "Use correct parameter names"
+        ]
+    },
+    r"invalid timestamp format": {
+        "description": "Timestamp parsing error",
+        "common_fixes": [
+            "Use correct timestamp format string",
+            "Validate timestamp before parsing",
+            "Use parse_timestamp with proper format"
+        ]
+    },
+    r"GROK pattern failed": {
+        "description": "GROK parsing failure",
+        "common_fixes": [
+            "Simplify GROK pattern",
+            "Use single-line GROK pattern",
+            "Test pattern with sample log",
+            "Use proper GROK syntax"
+        ]
+    }
+}
+
+_VRL_ERROR_RES = [re.compile(pattern, re.IGNORECASE) for pattern in VRL_ERROR_PATTERNS]
+_VRL_ERROR_INFOS = list(VRL_ERROR_PATTERNS.values())
+
+
+def _build_error_database():
+    """Compile all error patterns into one Hyperscan database (None if unavailable)"""
+    if hyperscan is None:
+        return None
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[pattern.encode() for pattern in VRL_ERROR_PATTERNS],
+            ids=list(range(len(VRL_ERROR_PATTERNS))),
+            elements=len(VRL_ERROR_PATTERNS),
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(VRL_ERROR_PATTERNS)
+        )
+        return db
+    except Exception:
+        return None
+
+
+_ERROR_DB = _build_error_database()
+
+
+def classify_error(error_message: str) -> Optional[Dict[str, Any]]:
+    """Return the info of the highest-priority error pattern matching the message, or None"""
+    # Hyperscan folds case and matches \w/\s in ASCII only, so other text takes the regex path
+    if _ERROR_DB is not None and error_message.isascii():
+        matches = []
+
+        def on_match(pattern_id, start, end, flags, context):
+            matches.append(pattern_id)
+
+        _ERROR_DB.scan(error_message.encode('ascii'), match_event_handler=on_match)
+        return _VRL_ERROR_INFOS[min(matches)] if matches else None
+
+    for info, pattern in zip(_VRL_ERROR_INFOS, _VRL_ERROR_RES):
+        if pattern.search(error_message):
+            return info
+    return None
+
+
 class EnhancedErrorHandler:
     """Enhanced error handler for VRL validation failures"""
     
@@ -17,49 +115,7 @@ class EnhancedErrorHandler:
         self.openrouter_agent = EnhancedOpenRouterAgent(rag_system, openrouter_api_key)
         
         # Common VRL error patterns and fixes
-        self.error_patterns = {
-            r"call to undefined variable\s+`(\w+)`": {
-                "description": "Undefined variable error",
-                "common_fixes": [
-                    "Check if variable is properly declared",
-                    "Use correct VRL syntax for variable access",
-                    "Ensure proper field mapping syntax"
-                ]
-            },
-            r"`exit` reported as used": {
-                "description": "Invalid exit statement",
-                "common_fixes": [
-                    "Replace 'exit' with 'return'",
-                    "Remove exit statement if not needed",
-                    "Use proper VRL flow control"
-                ]
-            },
-            r"missing function argument": {
-                "description": "Missing function argument",
-                "common_fixes": [
-                    "Provide required arguments to function",
-                    "Check function signature",
-                    "Use correct parameter names"
-                ]
-            },
-            r"invalid timestamp format": {
-                "description": "Timestamp parsing error",
-                "common_fixes": [
-                    "Use correct timestamp format string",
-                    "Validate timestamp before parsing",
-                    "Use parse_timestamp with proper format"
-                ]
-            },
-            r"GROK pattern failed": {
-                "description": "GROK parsing failure",
-                "common_fixes": [
-                    "Simplify GROK pattern",
-                    "Use single-line GROK pattern",
-                    "Test pattern with sample log",
-                    "Use proper GROK syntax"
-                ]
-            }
-        }
+        self.error_patterns = VRL_ERROR_PATTERNS
     
     def analyze_error(self, error_message: str) -> Dict[str, Any]:
         """Analyze Docker validation error and provide insights"""
@@ -73,11 +129,10 @@ class EnhancedErrorHandler:
         }
         
         # Check for known error patterns
-        for pattern, info in self.error_patterns.items():
-            if re.search(pattern, error_message, re.IGNORECASE):
-                error_analysis["error_type"] = info["description"]
-                error_analysis["suggestions"] = info["common_fixes"]
-                break
+        info = classify_error(error_message)
+        if info is not None:
+            error_analysis["error_type"] = info["description"]
+            error_analysis["suggestions"] = info["common_fixes"]
         
         # Extract specific error details
         if "undefined variable" in error_message.lower():
@@ -98,8 +153,13 @@ class EnhancedErrorHandler:
         return error_analysis
     
     def regenerate_vrl_with_error_context(self, original_vrl: str, error_message: str, 
-                                       log_content: str, log_format: str) -> Dict[str, Any]:
-        """Regenerate VRL code with error context using GPT-4"""
+                                       log_content: str, log_format: str,
+                                       on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Regenerate VRL code with error context using GPT-4
+        
+        If on_token is given the response is streamed and each text chunk is
+        passed to it as it arrives.
+        """
         
         try:
             # Analyze the error
@@ -144,10 +204,19 @@ Generate ONLY the corrected VRL code with the error fixed."""
             
             # Use GPT-4 to regenerate with error context
             chain = self.openrouter_agent.prompt | self.openrouter_agent.llm
-            response = chain.invoke({"input": regeneration_prompt})
+            if on_token is None:
+                response = chain.invoke({"input": regeneration_prompt})
+                response_text = response.content
+            else:
+                response_parts = []
+                for chunk in chain.stream({"input": regeneration_prompt}):
+                    if chunk.content:
+                        response_parts.append(chunk.content)
+                        on_token(chunk.content)
+                response_text = "".join(response_parts)
             
             # Extract VRL code from response
-            regenerated_vrl = response.content.strip()
+            regenerated_vrl = response_text.strip()
             
             # Clean up the response (remove markdown formatting if present)
             if regenerated_vrl.startswith("```"):
@@ -206,11 +275,170 @@ Generate ONLY the corrected VRL code with the error fixed."""
         return validation_result
 
 
+# MinHash permutations are (a * x + b) mod this prime over 64-bit blake2b shingle hashes
+_MINHASH_PRIME = (1 << 61) - 1
+
+
+class SemanticVRLCache:
+    """Near-duplicate cache of regeneration results (MinHash LSH over the error text)
+    
+    Docker/Vector errors for the same VRL recur with small differences (line
+    numbers, temp paths). Within the same (log_format, original VRL) scope,
+    LSH finds candidate entries and a lookup accepts the one whose exact
+    Jaccard similarity of error-text shingles is at least the threshold.
+    Signatures use blake2b and fixed permutations, so they are the same in
+    every process.
+    """
+    
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.9, max_entries: int = 256):
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # entry id -> (scope, signature, shingles, result)
+        self.buckets = {}  # (scope, band, band hash) -> set of entry ids
+        self._next_id = 0
+        self._lock = threading.Lock()  # shared by all sessions' script threads
+        rng = random.Random(num_perm)
+        self._permutations = [(rng.randrange(1, _MINHASH_PRIME), rng.randrange(_MINHASH_PRIME)) for _ in range(num_perm)]
+    
+    @staticmethod
+    def _scope(original_vrl: str, log_format: str) -> tuple:
+        return (log_format, hashlib.blake2b(original_vrl.encode("utf-8"), digest_size=16).hexdigest())
+    
+    @staticmethod
+    def _shingles(error_message: str) -> frozenset:
+        # Digits vary between runs (line/column numbers, temp names) - fold them
+        words = re.sub(r"\d+", "0", error_message.lower()).split()
+        return frozenset(" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2)))
+    
+    def _signature(self, shingles: frozenset) -> tuple:
+        hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+                  for shingle in shingles]
+        return tuple(min((a * h + b) % _MINHASH_PRIME for h in hashes) for a, b in self._permutations)
+    
+    def _band_keys(self, scope: tuple, signature: tuple):
+        for band in range(self.bands):
+            yield (scope, band, hash(signature[band * self.rows:(band + 1) * self.rows]))
+    
+    def get(self, original_vrl: str, error_message: str, log_format: str) -> Optional[Dict[str, Any]]:
+        """Return a cached regeneration result for a near-duplicate error, or None"""
+        scope = self._scope(original_vrl, log_format)
+        shingles = self._shingles(error_message)
+        signature = self._signature(shingles)
+        
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(scope, signature):
+                candidates.update(self.buckets.get(key, ()))
+        
+            best_id, best_similarity = None, self.threshold
+            for entry_id in candidates:
+                cached_shingles = self.entries[entry_id][2]
+                similarity = len(shingles & cached_shingles) / len(shingles | cached_shingles)
+                if similarity >= best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+        
+            if best_id is None:
+                return None
+            self.entries.move_to_end(best_id)
+            return self.entries[best_id][3]
+    
+    def put(self, original_vrl: str, error_message: str, log_format: str, result: Dict[str, Any]) -> None:
+        """Store a regeneration result"""
+        scope = self._scope(original_vrl, log_format)
+        shingles = self._shingles(error_message)
+        signature = self._signature(shingles)
+        
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self.entries[entry_id] = (scope, signature, shingles, result)
+            for key in self._band_keys(scope, signature):
+                self.buckets.setdefault(key, set()).add(entry_id)
+        
+            # Evict least recently used entries
+            while len(self.entries) > self.max_entries:
+                old_id, (old_scope, old_signature, _, _) = self.entries.popitem(last=False)
+                for key in self._band_keys(old_scope, old_signature):
+                    bucket = self.buckets.get(key)
+                    if bucket is not None:
+                        bucket.discard(old_id)
+                        if not bucket:
+                            del self.buckets[key]
+
+
+class VRLHistory:
+    """Failed VRL versions kept as parallel arrays: texts, error hashes, float16 embeddings
+    
+    Lookups are one matrix-vector product over the contiguous embedding
+    matrix, restricted to rows whose error hash matches.
+    """
+    
+    def __init__(self, dim: int, max_entries: int = 512):
+        self.max_entries = max_entries
+        # Preallocated ring: add fills one slot in place, the oldest slot once full
+        self.texts: List[Optional[str]] = [None] * max_entries
+        self.hashes = np.zeros(max_entries, dtype=np.uint64)
+        self.embeds = np.zeros((max_entries, dim), dtype=np.float16)
+        self.size = 0
+        self._next_slot = 0
+    
+    @staticmethod
+    def error_hash(error_message: str) -> int:
+        # Digits vary between runs (line/column numbers, temp names) - fold them
+        folded = re.sub(r"\d+", "0", error_message).encode("utf-8")
+        return int.from_bytes(hashlib.blake2b(folded, digest_size=8).digest(), "little")
+    
+    def add(self, vrl_text: str, error_message: str, embedding) -> None:
+        """Record a VRL version that failed with error_message (embedding L2-normalized)"""
+        slot = self._next_slot
+        self.texts[slot] = vrl_text
+        self.hashes[slot] = self.error_hash(error_message)
+        self.embeds[slot] = embedding
+        self._next_slot = (slot + 1) % self.max_entries
+        self.size = min(self.size + 1, self.max_entries)
+    
+    def nearest(self, embedding, error_message: Optional[str] = None) -> Optional[tuple]:
+        """Return (vrl_text, cosine similarity) of the closest recorded version, or None"""
+        if not self.size:
+            return None
+        scores = self.embeds[:self.size] @ np.asarray(embedding, dtype=np.float16)
+        if error_message is not None:
+            scores = np.where(self.hashes[:self.size] == np.uint64(self.error_hash(error_message)), scores, -np.inf)
+        best = int(np.argmax(scores))
+        if not np.isfinite(scores[best]):
+            return None
+        return self.texts[best], float(scores[best])
+
+
 def create_enhanced_error_handler(rag_system, openrouter_api_key: str) -> EnhancedErrorHandler:
     """Create enhanced error handler instance"""
     return EnhancedErrorHandler(rag_system, openrouter_api_key)
 
 
+# Shared error handlers by (id(rag_system), API key), least recently used first. Each
+# handler holds its rag_system, so an id() key cannot be reused while its entry exists.
+_ERROR_HANDLERS: "OrderedDict[tuple, EnhancedErrorHandler]" = OrderedDict()
+_ERROR_HANDLERS_MAX = 4
+_ERROR_HANDLERS_LOCK = threading.Lock()
+
+
+def get_error_handler(rag_system, openrouter_api_key: str) -> EnhancedErrorHandler:
+    """Shared error handler per (rag_system, API key), reusing its OpenRouter client"""
+    key = (id(rag_system), openrouter_api_key)
+    with _ERROR_HANDLERS_LOCK:
+        handler = _ERROR_HANDLERS.get(key)
+        if handler is not None:
+            _ERROR_HANDLERS.move_to_end(key)
+            return handler
+        handler = _ERROR_HANDLERS[key] = EnhancedErrorHandler(rag_system, openrouter_api_key)
+        # Evicting a handler releases its rag_system with it
+        while len(_ERROR_HANDLERS) > _ERROR_HANDLERS_MAX:
+            _ERROR_HANDLERS.popitem(last=False)
+        return handler
+
 if __name__ == "__main__":
     print("🔧 Enhanced Error Handler for VRL Validation")
     print("=" * 50)
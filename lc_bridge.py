@@ -1,10 +1,29 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 import re
 import json
+from functools import lru_cache
+# Optional faster JSON decoding; orjson.JSONDecodeError subclasses json.JSONDecodeError
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+# Optional linear-time regex engine (google-re2) for the per-log extractors
+try:
+    import re2 as _fastre
+except ImportError:
+    _fastre = re
+
+# Cleanup patterns for LLM JSON output
+_JSON_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.S)
+_JSON_COMMENT_RE = re.compile(r"//.*?$|/\*.*?\*/", re.M | re.S)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
 def _safe_json_loads(txt: str):
     """Parse LLM JSON output safely: strip fences, comments, trailing commas."""
     # strip code fences
-    txt = re.sub(r"^```(?:json)?\s*|\s*```$", "", txt.strip(), flags=re.S)
+    txt = _JSON_FENCE_RE.sub("", txt.strip())
     # keep outermost object/array
     i, j = txt.find("{"), txt.rfind("}")
     ia, ja = txt.find("["), txt.rfind("]")
@@ -13,10 +32,10 @@ def _safe_json_loads(txt: str):
     elif ia != -1 and ja != -1:
         txt = txt[ia:ja+1]
     # remove comments
-    txt = re.sub(r"//.*?$|/\*.*?\*/", "", txt, flags=re.M|re.S)
+    txt = _JSON_COMMENT_RE.sub("", txt)
     # remove trailing commas
-    txt = re.sub(r",\s*([}\]])", r"\1", txt)
-    return json.loads(txt)
+    txt = _TRAILING_COMMA_RE.sub(r"\1", txt)
+    return _json_loads(txt)
 
 # Ensure we always defer to log_analyzer for log_format detection
 try:
@@ -33,8 +52,14 @@ def _ollama(model: str) -> Ollama:
     return Ollama(model=model)
 
 
-def _infer_vendor_product_from_text(text: str) -> Dict[str, str]:
-    """Lightweight heuristic mapping for vendor/product from raw text."""
+# The deterministic detectors below depend only on the raw log, so repeated
+# logs (heartbeats, retries) are answered from these caches
+LOG_DETECTOR_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=LOG_DETECTOR_CACHE_SIZE)
+def _infer_vendor_product_from_text(text: str) -> Tuple[Optional[str], Optional[str]]:
+    """Lightweight heuristic mapping for (vendor, product) from raw text."""
     t = text.lower()
     vendor = None
     product = None
@@ -55,22 +80,43 @@ def _infer_vendor_product_from_text(text: str) -> Dict[str, str]:
     elif "azure" in t:
         vendor = "Microsoft"
         product = "Azure"
-    return {"vendor": vendor, "product": product}
+    return vendor, product
+
+
+# RFC3164: <PRI>MMM DD HH:MM:SS HOST PROGRAM[pid]: message
+_RFC3164_PROGRAM_RE = re.compile(r"^<\d+>[A-Za-z]{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}\s+\S+\s+([^:\[]+)(?:\[[^\]]+\])?:")
+# RFC5424: <PRI>VER TIMESTAMP HOST APPNAME PROCID MSGID [SD] MSG
+_RFC5424_PROGRAM_RE = re.compile(r"^<\d+>\d\s+\S+\s+\S+\s+(\S+)\s+\S+\s+\S+\s+")
 
 
+@lru_cache(maxsize=LOG_DETECTOR_CACHE_SIZE)
 def _extract_syslog_program(line: str) -> str | None:
     """Extract syslog program/app name when present (RFC3164/RFC5424 variants)."""
-    # RFC3164: <PRI>MMM DD HH:MM:SS HOST PROGRAM[pid]: message
-    m = re.search(r"^<\d+>[A-Za-z]{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}\s+\S+\s+([^:\[]+)(?:\[[^\]]+\])?:", line)
+    m = _RFC3164_PROGRAM_RE.search(line)
     if m:
         return m.group(1)
-    # RFC5424: <PRI>VER TIMESTAMP HOST APPNAME PROCID MSGID [SD] MSG
-    m = re.search(r"^<\d+>\d\s+\S+\s+\S+\s+(\S+)\s+\S+\s+\S+\s+", line)
+    m = _RFC5424_PROGRAM_RE.search(line)
     if m:
         return m.group(1)
     return None
 
 
+# Keys every classify_log_lc result carries, and the all-unknown result shape
+_CLASSIFY_KEYS = ("log_type", "log_format", "log_source", "product", "vendor")
+_CLASSIFY_DEFAULTS = dict.fromkeys(_CLASSIFY_KEYS)
+
+
+@lru_cache(maxsize=LOG_DETECTOR_CACHE_SIZE)
+def _detect_log_format(raw_log: str) -> str | None:
+    """log_analyzer's format for raw_log, or None when unavailable."""
+    if log_analyzer is None:
+        return None
+    try:
+        return log_analyzer.identify_log_type(raw_log)
+    except Exception:
+        return None
+
+
 def classify_log_lc(raw_log: str, dynamic_prefix: str = "") -> Dict[str, Any]:
     template = (
         (dynamic_prefix + "\n\n") if dynamic_prefix else ""
@@ -97,20 +143,15 @@ def classify_log_lc(raw_log: str, dynamic_prefix: str = "") -> Dict[str, Any]:
         try:
             result = _safe_json_loads(json_str)
         except json.JSONDecodeError:
-            result = {}
+            result = _CLASSIFY_DEFAULTS.copy()
     else:
-        result = {}
+        result = _CLASSIFY_DEFAULTS.copy()
 
     # Normalize and enrich using deterministic detectors
-    detected_format = None
-    if log_analyzer is not None:
-        try:
-            detected_format = log_analyzer.identify_log_type(raw_log)
-        except Exception:
-            detected_format = None
+    detected_format = _detect_log_format(raw_log)
 
     # Ensure keys exist
-    for k in ["log_type", "log_format", "log_source", "product", "vendor"]:
+    for k in _CLASSIFY_KEYS:
         result.setdefault(k, None)
 
     # Force log_format from detector (lowercase), ensure 'json' stays lowercase
@@ -124,11 +165,11 @@ def classify_log_lc(raw_log: str, dynamic_prefix: str = "") -> Dict[str, Any]:
             result["log_source"] = prog
 
     # Vendor/product heuristics (e.g., Cisco)
-    vp = _infer_vendor_product_from_text(raw_log)
-    if not result.get("vendor") and vp.get("vendor"):
-        result["vendor"] = vp["vendor"]
-    if not result.get("product") and vp.get("product"):
-        result["product"] = vp["product"]
+    vp_vendor, vp_product = _infer_vendor_product_from_text(raw_log)
+    if not result.get("vendor") and vp_vendor:
+        result["vendor"] = vp_vendor
+    if not result.get("product") and vp_product:
+        result["product"] = vp_product
     # If vendor is Cisco but product still empty, default product to Cisco
     if (result.get("vendor") or "").lower() == "cisco" and not result.get("product"):
         result["product"] = "Cisco"
@@ -249,54 +290,70 @@ def _extract_and_clean_json(text: str, original_log: str) -> Dict[str, Any]:
     return _generate_structured_ecs(original_log, text)
 
 
+_UNQUOTED_KEY_RE = re.compile(r'(\w+):')
+_LINE_COMMENT_RE = re.compile(r'//.*$', re.MULTILINE)
+
+
 def _fix_common_json_issues(json_str: str) -> str:
     """Fix common JSON formatting issues"""
-    import re
-    
     # Remove trailing commas
-    json_str = re.sub(r',\s*}', '}', json_str)
-    json_str = re.sub(r',\s*]', ']', json_str)
+    json_str = _TRAILING_COMMA_RE.sub(r'\1', json_str)
     
     # Fix unquoted keys
-    json_str = re.sub(r'(\w+):', r'"\1":', json_str)
+    json_str = _UNQUOTED_KEY_RE.sub(r'"\1":', json_str)
     
     # Fix single quotes to double quotes
     json_str = json_str.replace("'", '"')
     
     # Remove comments
-    json_str = re.sub(r'//.*$', '', json_str, flags=re.MULTILINE)
+    json_str = _LINE_COMMENT_RE.sub('', json_str)
     
     return json_str
 
 
+# Timestamp, IPv4 and username extractors for _generate_structured_ecs
+_ECS_TIMESTAMP_RE = _fastre.compile(r'(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2})')
+_ECS_IP_RE = _fastre.compile(r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b')
+_ECS_USER_RE = _fastre.compile(r'(?i)(?:user|username|account)[\s:=]+([a-zA-Z0-9_-]+)')
+
+# Keywords for event categories, checked in order against one lowercased copy
+# of the log; plain substring tests beat a case-insensitive regex alternation
+_ECS_CATEGORY_KEYWORDS = (
+    ("authentication", ("login", "auth", "password")),
+    ("network", ("connection", "tcp", "udp", "network")),
+    ("error", ("error", "failed", "denied")),
+)
+
+
+def _match_category(text: str, category_keywords) -> str:
+    """Return the first category with a keyword in text (case-insensitive)."""
+    lowered = text.lower()
+    for category, keywords in category_keywords:
+        for keyword in keywords:
+            if keyword in lowered:
+                return category
+    return "unknown"
+
+
 def _generate_structured_ecs(original_log: str, llm_output: str) -> Dict[str, Any]:
     """Generate structured ECS JSON from log content"""
     from datetime import datetime
-    import re
     
     # Extract timestamp if present
     timestamp = datetime.now().isoformat() + "Z"
-    timestamp_match = re.search(r'(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2})', original_log)
+    timestamp_match = _ECS_TIMESTAMP_RE.search(original_log)
     if timestamp_match:
         timestamp = timestamp_match.group(1).replace(' ', 'T') + 'Z'
     
     # Extract IP addresses
-    ip_pattern = r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b'
-    ips = re.findall(ip_pattern, original_log)
+    ips = _ECS_IP_RE.findall(original_log)
     
     # Extract usernames (common patterns)
-    user_pattern = r'(?:user|username|account)[\s:=]+([a-zA-Z0-9_-]+)'
-    user_match = re.search(user_pattern, original_log, re.IGNORECASE)
+    user_match = _ECS_USER_RE.search(original_log)
     username = user_match.group(1) if user_match else None
     
     # Determine event category
-    category = "unknown"
-    if any(word in original_log.lower() for word in ['login', 'auth', 'password']):
-        category = "authentication"
-    elif any(word in original_log.lower() for word in ['connection', 'tcp', 'udp', 'network']):
-        category = "network"
-    elif any(word in original_log.lower() for word in ['error', 'failed', 'denied']):
-        category = "error"
+    category = _match_category(original_log, _ECS_CATEGORY_KEYWORDS)
     
     # Build ECS structure
     ecs_json = {
@@ -349,278 +406,57 @@ def _generate_fallback_ecs(original_log: str, error_msg: str) -> Dict[str, Any]:
 
 def generate_vrl_lc(context_text: str, raw_log: str, dynamic_prefix: str = "") -> str:
     """Generate VRL parser using perfect simple templates"""
+    return generate_vrl_lc_batch(context_text, [raw_log], dynamic_prefix)[0]
+
+
+def generate_vrl_lc_batch(context_text: str, raw_logs: List[str], dynamic_prefix: str = "") -> List[str]:
+    """Generate VRL parsers for many logs, one per log, sharing a single agent"""
     try:
-        # Use simple agent with perfect VRL generation
         from simple_langchain_agent import SimpleLogParsingAgent
         from complete_rag_system import CompleteRAGSystem
         
-        rag = CompleteRAGSystem()
-        agent = SimpleLogParsingAgent(rag)
-        result = agent.generate_vrl_parser(raw_log)
-        
-        if result["success"]:
-            return result["vrl_code"]
-        else:
-            # Fallback to automated VRL generation
-            return _generate_fallback_vrl(raw_log, result.get("error", "Unknown error"))
-        
+        agent = SimpleLogParsingAgent(CompleteRAGSystem())
     except Exception as e:
         # Fallback to automated VRL generation
-        return _generate_fallback_vrl(raw_log, str(e))
-
-
-def _generate_vrl_from_template(log_profile: Dict[str, Any], raw_log: str, reference_vrl: str) -> str:
-    """Generate VRL from template based on log profile and reference"""
-    vendor = (log_profile.get("vendor") or "unknown").lower()
-    product = (log_profile.get("product") or "unknown").lower()
-    log_type = (log_profile.get("log_type") or "unknown").lower()
-    
-    # Determine event category based on log content
-    category = "unknown"
-    if any(word in raw_log.lower() for word in ['login', 'auth', 'password', 'user']):
-        category = "authentication"
-    elif any(word in raw_log.lower() for word in ['connection', 'tcp', 'udp', 'network', 'built']):
-        category = "network"
-    elif any(word in raw_log.lower() for word in ['error', 'failed', 'denied', 'blocked']):
-        category = "error"
-    elif any(word in raw_log.lower() for word in ['firewall', 'asa', 'fortinet', 'palo']):
-        category = "security"
-    
-    # Generate clean VRL based on log type
-    if log_type == "asa" or "cisco" in vendor:
-        return _generate_cisco_asa_vrl(raw_log, category, vendor, product)
-    elif "json" in log_type.lower() or raw_log.strip().startswith('{'):
-        return _generate_json_vrl(raw_log, category, vendor, product)
-    elif "syslog" in log_type or raw_log.startswith('<') or raw_log.startswith('%'):
-        return _generate_syslog_vrl(raw_log, category, vendor, product)
-    elif (("http" in log_type.lower() or "access" in log_type.lower()) if log_type else False) or ("apache" in product.lower() if product else False) or ("nginx" in product.lower() if product else False) or ("apache" in vendor.lower() if vendor else False) or ('GET' in raw_log and 'HTTP' in raw_log):
-        return _generate_apache_vrl(raw_log, category, vendor, product)
-    else:
-        return _generate_generic_vrl(raw_log, category, vendor, product)
-
-def _generate_apache_vrl(raw_log: str, category: str, vendor: str, product: str) -> str:
-    """Generate VRL for Apache/Nginx access logs"""
-    return f"""
-.event.kind = "event"
-.event.category = ["web"]
-.observer.vendor = "{vendor}"
-.observer.product = "{product}"
-.observer.type = "web-server"
-.event.dataset = "{vendor}.{product}"
-
-if exists(.message) && is_string(.message) {{
-  .event.original = del(.message)
-}}
-
-# Parse Apache access log format
-if exists(.event.original) {{
-  # Extract client IP
-  if .event.original matches /^(\\d+\\.\\d+\\.\\d+\\.\\d+)/ {{
-    .source.ip = $1
-  }}
-  
-  # Extract timestamp
-  if .event.original matches /\\[(\\d{2}\\/[A-Za-z]{3}\\/\\d{4}:\\d{2}:\\d{2}:\\d{2} [+-]\\d{4})\\]/ {{
-    .@timestamp = parse_timestamp!($1, format: "%d/%b/%Y:%H:%M:%S %z")
-  }}
-  
-  # Extract HTTP method
-  if .event.original matches /"([A-Z]+) / {{
-    .http.request.method = $1
-  }}
-  
-  # Extract request URI
-  if .event.original matches /"[A-Z]+ ([^ ]+) HTTP/ {{
-    .url.original = $1
-  }}
-  
-  # Extract HTTP version
-  if .event.original matches /HTTP\\/(\\d\\.\\d)/ {{
-    .http.version = $1
-  }}
-  
-  # Extract status code
-  if .event.original matches /" \\d+ (\\d{3}) / {{
-    .http.response.status_code = to_int!($1)
-  }}
-  
-  # Extract response size
-  if .event.original matches /" \\d+ \\d{3} (\\d+) / {{
-    .http.response.body.bytes = to_int!($1)
-  }}
-  
-  # Extract referer
-  if .event.original matches /" ([^"]+) " "([^"]+)"$/ {{
-    .http.request.referrer = $1
-    .user_agent.original = $2
-  }}
-  
-  # Set event action and outcome
-  .event.action = "http_request"
-  .event.outcome = if .http.response.status_code >= 200 && .http.response.status_code < 300 {{ "success" }} else if .http.response.status_code >= 400 {{ "failure" }} else {{ "unknown" }}
-}}
-
-# HTTP-specific processing
-if exists(.http.request.method) {{ .http.request.method = .http.request.method | upcase }}
-if exists(.http.response.status_code) {{
-  .http.response.status_class = if .http.response.status_code >= 200 && .http.response.status_code < 300 {{ "2xx" }} else if .http.response.status_code >= 300 && .http.response.status_code < 400 {{ "3xx" }} else if .http.response.status_code >= 400 && .http.response.status_code < 500 {{ "4xx" }} else if .http.response.status_code >= 500 {{ "5xx" }} else {{ "unknown" }}
-}}
-
-.related.ip = unique(compact([.source.ip, .destination.ip]))
-. = compact(., string: true, array: true, object: true, null: true)
-"""
-
-def _generate_cisco_asa_vrl(raw_log: str, category: str, vendor: str, product: str) -> str:
-    """Generate VRL for Cisco ASA logs"""
-    return f"""
-.event.kind = "event"
-.event.category = ["{category}"]
-.observer.vendor = "{vendor}"
-.observer.product = "{product}"
-.observer.type = "firewall"
-.event.dataset = "{vendor}.{product}"
-
-if exists(.message) && is_string(.message) {{
-  .event.original = del(.message)
-}}
-
-# Parse Cisco ASA log format
-if exists(.event.original) {{
-  # Extract connection ID
-  if .event.original matches /connection (\\d+)/ {{
-    .event_data.connection_id = $1
-  }}
-  
-  # Extract source IP
-  if .event.original matches /outside:([\\d.]+)/ {{
-    .source.ip = $1
-  }}
-  
-  # Extract destination IP  
-  if .event.original matches /inside:([\\d.]+)/ {{
-    .destination.ip = $1
-  }}
-  
-  # Extract ports
-  if .event.original matches /outside:[\\d.]+\\/(\\d+)/ {{
-    .source.port = to_int!($1)
-  }}
-  
-  if .event.original matches /inside:[\\d.]+\\/(\\d+)/ {{
-    .destination.port = to_int!($1)
-  }}
-  
-  # Extract protocol
-  if .event.original matches /(TCP|UDP) connection/ {{
-    .network.protocol = $1
-  }}
-  
-  # Set action
-  if .event.original matches /Built outbound/ {{
-    .event.action = "connection_established"
-  }}
-}}
-
-.related.ip = unique(compact([.source.ip, .destination.ip]))
-. = compact(., string: true, array: true, object: true, null: true)
-"""
-
-def _generate_json_vrl(raw_log: str, category: str, vendor: str, product: str) -> str:
-    """Generate VRL for JSON logs"""
-    return f"""
-.event.kind = "event"
-.event.category = ["{category}"]
-.observer.vendor = "{vendor}"
-.observer.product = "{product}"
-.observer.type = "application"
-.event.dataset = "{vendor}.{product}"
-
-if exists(.message) && is_string(.message) {{
-  .event.original = del(.message)
-}}
-
-# Parse JSON log
-if exists(.event.original) {{
-  parsed = parse_json(.event.original)
-  if is_object(parsed) {{
-    .event_data = merge(.event_data, parsed, deep: true)
-    
-    # Map common JSON fields to ECS
-    if exists(.event_data.timestamp) {{ .@timestamp = parse_timestamp(.event_data.timestamp, "%Y-%m-%dT%H:%M:%SZ") }}
-    if exists(.event_data.level) {{ .log.level = del(.event_data.level) }}
-    if exists(.event_data.user) {{ .user.name = del(.event_data.user) }}
-    if exists(.event_data.ip) {{ .source.ip = del(.event_data.ip) }}
-    if exists(.event_data.message) {{ .message = del(.event_data.message) }}
-  }}
-}}
-
-.related.ip = unique(compact([.source.ip, .destination.ip]))
-. = compact(., string: true, array: true, object: true, null: true)
-"""
-
-def _generate_syslog_vrl(raw_log: str, category: str, vendor: str, product: str) -> str:
-    """Generate VRL for syslog"""
-    return f"""
-.event.kind = "event"
-.event.category = ["{category}"]
-.observer.vendor = "{vendor}"
-.observer.product = "{product}"
-.observer.type = "system"
-.event.dataset = "{vendor}.{product}"
-
-if exists(.message) && is_string(.message) {{
-  .event.original = del(.message)
-}}
-
-# Parse syslog
-if exists(.event.original) {{
-  parsed = parse_syslog(.event.original)
-  if is_object(parsed) {{
-    .event_data = merge(.event_data, parsed, deep: true)
-    
-    # Map syslog fields to ECS
-    if exists(.event_data.timestamp) {{ .@timestamp = .event_data.timestamp }}
-    if exists(.event_data.hostname) {{ .host.name = del(.event_data.hostname) }}
-    if exists(.event_data.program) {{ .process.name = del(.event_data.program) }}
-    if exists(.event_data.severity) {{ .log.level = del(.event_data.severity) }}
-  }}
-}}
-
-.related.ip = unique(compact([.source.ip, .destination.ip]))
-. = compact(., string: true, array: true, object: true, null: true)
-"""
-
-def _generate_generic_vrl(raw_log: str, category: str, vendor: str, product: str) -> str:
-    """Generate generic VRL for unknown log types"""
-    return f"""
-.event.kind = "event"
-.event.category = ["{category}"]
-.observer.vendor = "{vendor}"
-.observer.product = "{product}"
-.observer.type = "unknown"
-.event.dataset = "{vendor}.{product}"
-
-if exists(.message) && is_string(.message) {{
-  .event.original = del(.message)
-}}
-
-# Basic parsing attempt
-if exists(.event.original) {{
-  # Try key-value parsing
-  kvs = parse_key_value(.event.original, field_delimiter: " ", key_value_delimiter: "=")
-  if is_object(kvs) {{
-    .event_data = merge(.event_data, kvs, deep: true)
-  }}
-  
-  # Extract IP addresses
-  if .event.original matches /(\\d{{1,3}}\\.\\d{{1,3}}\\.\\d{{1,3}}\\.\\d{{1,3}})/ {{
-    .source.ip = $1
-  }}
-}}
+        return [_generate_fallback_vrl(raw_log, str(e)) for raw_log in raw_logs]
+    
+    # Identical logs (heartbeats, retries) are generated once
+    generated: Dict[str, str] = {}
+    for raw_log in raw_logs:
+        if raw_log in generated:
+            continue
+        try:
+            result = agent.generate_vrl_parser(raw_log)
+            if result["success"]:
+                generated[raw_log] = result["vrl_code"]
+            else:
+                generated[raw_log] = _generate_fallback_vrl(raw_log, result.get("error", "Unknown error"))
+        except Exception as e:
+            generated[raw_log] = _generate_fallback_vrl(raw_log, str(e))
+    
+    return [generated[raw_log] for raw_log in raw_logs]
+
+
+# Reference examples by vendor/product/format keyword, first match wins
+_REFERENCE_VRL_FILES = (
+    ("cisco", "fortinet_fortigate_professional.vrl"),  # Use Fortinet as template for network devices
+    ("fortinet", "fortinet_fortigate_professional.vrl"),
+    ("fortigate", "fortinet_fortigate_professional.vrl"),
+    ("palo", "palo_alto_professional.vrl"),
+    ("palo_alto", "palo_alto_professional.vrl"),
+    ("aws", "aws_elb_professional.vrl"),
+    ("elb", "aws_elb_professional.vrl"),
+    ("apache", "apache_access_professional.vrl"),
+)
+_DEFAULT_REFERENCE_VRL = "fortinet_fortigate_professional.vrl"
+
+
+@lru_cache(maxsize=None)
+def _read_reference_vrl(filename: str) -> str:
+    """Read a reference example once; failures are not cached"""
+    with open(f"data/reference_examples/{filename}", 'r') as f:
+        return f.read()
 
-.related.ip = unique(compact([.source.ip, .destination.ip]))
-. = compact(., string: true, array: true, object: true, null: true)
-"""
 
 def _get_reference_vrl_for_log(log_profile: Dict[str, Any], raw_log: str) -> str:
     """Get appropriate reference VRL example based on log profile"""
@@ -628,34 +464,16 @@ def _get_reference_vrl_for_log(log_profile: Dict[str, Any], raw_log: str) -> str
     product = log_profile.get("product", "").lower()
     log_format = log_profile.get("log_format", "").lower()
     
-    # Map log types to reference examples
-    reference_mapping = {
-        "cisco": "fortinet_fortigate_professional.vrl",  # Use Fortinet as template for network devices
-        "fortinet": "fortinet_fortigate_professional.vrl",
-        "fortigate": "fortinet_fortigate_professional.vrl",
-        "palo": "palo_alto_professional.vrl",
-        "palo_alto": "palo_alto_professional.vrl",
-        "aws": "aws_elb_professional.vrl",
-        "elb": "aws_elb_professional.vrl",
-        "apache": "apache_access_professional.vrl"
-    }
-    
-    # Try to find matching reference
-    reference_file = None
-    for key, filename in reference_mapping.items():
-        if key in vendor or key in product or key in log_format:
-            reference_file = filename
-            break
-    
-    # Default to Fortinet if no match
-    if not reference_file:
-        reference_file = "fortinet_fortigate_professional.vrl"
+    # Try to find matching reference, defaulting to Fortinet
+    reference_file = next(
+        (filename for key, filename in _REFERENCE_VRL_FILES
+         if key in vendor or key in product or key in log_format),
+        _DEFAULT_REFERENCE_VRL,
+    )
     
     # Load the reference file
     try:
-        reference_path = f"data/reference_examples/{reference_file}"
-        with open(reference_path, 'r') as f:
-            return f.read()
+        return _read_reference_vrl(reference_file)
     except Exception as e:
         # Return a basic template if file not found
         return _get_basic_vrl_template()
@@ -671,7 +489,7 @@ def _get_basic_vrl_template() -> str:
 .observer.type = "firewall"
 .event.dataset = "unknown.logs"
 
-if exists(.message) && is_string(.message) {
+if is_string(.message) {
   .event.original = del(.message)
 }
 
@@ -691,55 +509,49 @@ if exists(.event_data.action) { .event.action = del(.event_data.action) }
 """
 
 
+# Placeholder maps like { "k" => "v" } that LLMs copy from the prompt
+_EVENT_DATA_PLACEHOLDER_RE = re.compile(r'event_data\s*\{\s*"k"\s*=>\s*"v"\s*\}')
+_MAP_PLACEHOLDER_RE = re.compile(r'\{\s*"k"\s*=>\s*"v"\s*\}')
+
+# Comment, markdown and LLM-prose line starts that _clean_vrl_output drops
+_NON_VRL_PREFIXES = (
+    '#', '//', '```', 'ECS', 'Type:', 'Description:', 'Generated VRL',
+    'Here is', 'The VRL', 'Based on', 'Following', 'Rules:', 'IMPORTANT:',
+    'You are', 'Missing some input keys', '1.', '2.', '3.', '4.',
+)
+
 def _clean_vrl_output(vrl_output: str) -> str:
     """Clean VRL output to remove non-VRL content and fix common issues"""
     # Pre-sanitize common LLM artifacts that break VRL
     sanitized = vrl_output
-    # Drop any line that includes the LLM's placeholder error note
-    sanitized = "\n".join(
-        line for line in sanitized.split('\n')
-        if 'Missing some input keys' not in line
-    )
-    # Normalize placeholder maps like { "k" => "v" }
-    sanitized = re.sub(r'event_data\s*\{\s*"k"\s*=>\s*"v"\s*\}', '.event_data = {}', sanitized)
-    sanitized = re.sub(r'\{\s*"k"\s*=>\s*"v"\s*\}', '{}', sanitized)
-    # Drop any line that still contains Ruby-style hash rocket '=>' (not valid VRL)
-    sanitized = "\n".join(line for line in sanitized.split('\n') if '=>' not in line)
+    if '=>' in sanitized:
+        # Drop any line that includes the LLM's placeholder error note before
+        # normalizing placeholder maps like { "k" => "v" }
+        sanitized = "\n".join(
+            line for line in sanitized.split('\n')
+            if 'Missing some input keys' not in line
+        )
+        sanitized = _EVENT_DATA_PLACEHOLDER_RE.sub('.event_data = {}', sanitized)
+        sanitized = _MAP_PLACEHOLDER_RE.sub('{}', sanitized)
 
-    lines = sanitized.split('\n')
     vrl_lines = []
     
-    for line in lines:
+    for line in sanitized.split('\n'):
+        # Drop placeholder error notes and any line that still contains a
+        # Ruby-style hash rocket '=>' (not valid VRL)
+        if 'Missing some input keys' in line or '=>' in line:
+            continue
         line = line.strip()
         # Skip empty lines, comments, and non-VRL content
-        if (line and 
-            not line.startswith('#') and 
-            not line.startswith('//') and
-            not line.startswith('```') and
-            not line.startswith('ECS') and
-            not line.startswith('Type:') and
-            not line.startswith('Description:') and
-            not line.startswith('Generated VRL') and
-            not line.startswith('Here is') and
-            not line.startswith('The VRL') and
-            not line.startswith('Based on') and
-            not line.startswith('Following') and
-            not line.startswith('Rules:') and
-            not line.startswith('IMPORTANT:') and
-            not line.startswith('You are') and
-            not line.startswith('Missing some input keys') and
-            not line.startswith('1.') and
-            not line.startswith('2.') and
-            not line.startswith('3.') and
-            not line.startswith('4.')):
+        if line and not line.startswith(_NON_VRL_PREFIXES):
             
             # Fix common VRL syntax issues
             line = _fix_vrl_syntax(line)
             if line:  # Only add non-empty lines
                 vrl_lines.append(line)
     
-    # If we have very few lines or the output looks malformed, return a basic fallback
-    if len(vrl_lines) < 3 or any('Missing some input keys' in line for line in vrl_lines):
+    # If we have very few lines, return a basic fallback
+    if len(vrl_lines) < 3:
         return _generate_basic_vrl()
     
     # Validate that we have proper VRL structure
@@ -800,7 +612,7 @@ def _generate_basic_vrl() -> str:
 .observer.type = "unknown"
 .event.dataset = "unknown.logs"
 
-if exists(.message) && is_string(.message) {
+if is_string(.message) {
   .event.original = del(.message)
 }
 
@@ -814,12 +626,7 @@ if exists(.event.original) {
 """
 
 
-def _generate_fallback_vrl(raw_log: str, error_msg: str) -> str:
-    """Generate fallback VRL when all else fails"""
-    return f"""
-# Fallback VRL Parser
-# Error: {error_msg}
-
+_FALLBACK_VRL_BODY = """
 .event.kind = "event"
 .event.category = ["unknown"]
 .observer.vendor = "unknown"
@@ -827,15 +634,20 @@ def _generate_fallback_vrl(raw_log: str, error_msg: str) -> str:
 .observer.type = "unknown"
 .event.dataset = "unknown.logs"
 
-if exists(.message) && is_string(.message) {{
+if is_string(.message) {
   .event.original = del(.message)
-}}
+}
 
 # Basic parsing attempt
 kvs = parse_key_value(.event.original, field_delimiter: " ", key_value_delimiter: "=")
-if is_object(kvs) {{ .event_data = merge(.event_data, kvs, deep: true) }}
+if is_object(kvs) { .event_data = merge(.event_data, kvs, deep: true) }
 
 . = compact(., string: true, array: true, object: true, null: true)
 """
 
 
+def _generate_fallback_vrl(raw_log: str, error_msg: str) -> str:
+    """Generate fallback VRL when all else fails"""
+    return f"\n# Fallback VRL Parser\n# Error: {error_msg}\n" + _FALLBACK_VRL_BODY
+
+
@@ -15,6 +15,20 @@ from complete_rag_system import CompleteRAGSystem
 from log_analyzer import identify_log_type
 from lc_bridge import generate_ecs_json_lc as generate_ecs_json
 
+# Placeholder the VRL prompt asks the model to fill in, and the parse block
+# substituted for it per log format when the model leaves it in place
+_GROK_PLACEHOLDER = "[BUILD COMPLETE GROK PATTERN WITH %{PATTERN:field} SYNTAX]"
+_FORMAT_PARSE_BLOCKS = {
+    "json": "# Parse JSON\njson_parsed, json_err = parse_json(raw)\nif json_err == null { . = merge(., json_parsed, deep: true) }",
+    "syslog": "# Parse syslog\nsyslog_parsed, syslog_err = parse_syslog(raw)\nif syslog_err == null { . = merge(., syslog_parsed, deep: true) }",
+}
+_DEFAULT_PARSE_BLOCK = "# Parse key-value\nkv_parsed, kv_err = parse_key_value(raw)\nif kv_err == null { . = merge(., kv_parsed, deep: true) }"
+
+# Sourcelist vendors too generic to score, and product words worth a
+# whole-word match of their own
+_GENERIC_VENDOR_KEYWORDS = frozenset({"unknown", "generic"})
+_SPECIFIC_PRODUCT_KEYWORDS = frozenset({"asa", "ios", "fortigate", "pan-os", "windows", "linux", "syslog"})
+
 
 class VRL_Error_Handler:
     """Simple VRL error handler for compatibility"""
@@ -83,7 +97,7 @@ Be thorough and ensure generated parsers follow best practices."""),
                 product_keywords = entry.get("observer.product", "").lower()
                 
                 # Skip entries with empty or generic keywords
-                if not vendor_keywords or vendor_keywords in ["unknown", "generic"]:
+                if not vendor_keywords or vendor_keywords in _GENERIC_VENDOR_KEYWORDS:
                     continue
                 
                 # Create search patterns from vendor and product
@@ -105,7 +119,7 @@ Be thorough and ensure generated parsers follow best practices."""),
                     # Handle special cases like "asa", "ios", "fortigate", etc.
                     specific_keywords = product_keywords.split()
                     for keyword in specific_keywords:
-                        if keyword in ["asa", "ios", "fortigate", "pan-os", "windows", "linux", "syslog"]:
+                        if keyword in _SPECIFIC_PRODUCT_KEYWORDS:
                             if re.search(rf'(?i)\b{re.escape(keyword)}\b', log_content):
                                 score += 4  # Specific product keyword match
                 
@@ -584,17 +598,9 @@ CRITICAL:
             # If AI generation has placeholders, clean them up
             if "GROK-PATTERN-HERE" in vrl_code or "BUILD" in vrl_code:
                 # Replace placeholders with actual pattern based on log content
-                import re
                 # Simple fallback: use parse_syslog/parse_json based on format
-                if log_format == "json":
-                    vrl_code = vrl_code.replace("[BUILD COMPLETE GROK PATTERN WITH %{PATTERN:field} SYNTAX]", 
-                                               "# Parse JSON\njson_parsed, json_err = parse_json(raw)\nif json_err == null { . = merge(., json_parsed, deep: true) }")
-                elif log_format == "syslog":
-                    vrl_code = vrl_code.replace("[BUILD COMPLETE GROK PATTERN WITH %{PATTERN:field} SYNTAX]",
-                                               "# Parse syslog\nsyslog_parsed, syslog_err = parse_syslog(raw)\nif syslog_err == null { . = merge(., syslog_parsed, deep: true) }")
-                else:
-                    vrl_code = vrl_code.replace("[BUILD COMPLETE GROK PATTERN WITH %{PATTERN:field} SYNTAX]",
-                                               "# Parse key-value\nkv_parsed, kv_err = parse_key_value(raw)\nif kv_err == null { . = merge(., kv_parsed, deep: true) }")
+                parse_block = _FORMAT_PARSE_BLOCKS.get(log_format, _DEFAULT_PARSE_BLOCK)
+                vrl_code = vrl_code.replace(_GROK_PLACEHOLDER, parse_block)
             return {
                 "success": True,
                 "vrl_code": vrl_code.strip(),
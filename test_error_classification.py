@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test VRL error classification (Hyperscan and regex fallback)
+"""
+
+import random
+import re
+
+import pytest
+
+import enhanced_error_handler
+from enhanced_error_handler import VRL_ERROR_PATTERNS, classify_error
+
+FRAGMENTS = ["call to undefined variable", "Call To Undefined Variable", "`host`", "`café`", "`x1`",
+             "`exit` reported as used", "MISSING function argument", "invalid timestamp format",
+             "GROK pattern failed", "GROK pattern faıled", "miſſing function argument",
+             "call to undefined variable\u00a0`x`", "error[E701]:", "\n", "\t", " ", "┌─ :12:7", "=", "…"]
+
+
+def original_classify(error_message):
+    """The per-pattern loop classify_error replaced"""
+    for pattern, info in VRL_ERROR_PATTERNS.items():
+        if re.search(pattern, error_message, re.IGNORECASE):
+            return info
+    return None
+
+
+def random_errors(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield "".join(rng.choice(FRAGMENTS) + rng.choice(["", " "]) for _ in range(rng.randint(0, 6)))
+
+
+def test_known_errors():
+    """Known errors map to their pattern, unknown ones to None"""
+    assert classify_error("error[E701]: call to undefined variable `host`")["description"] == "Undefined variable error"
+    assert classify_error("`exit` reported as used, GROK pattern failed")["description"] == "Invalid exit statement"
+    assert classify_error("error[E110]: invalid argument type") is None
+
+
+def test_regex_fallback_matches_original(monkeypatch):
+    """Without Hyperscan, classification matches the original loop"""
+    monkeypatch.setattr(enhanced_error_handler, "_ERROR_DB", None)
+    for error_message in random_errors(5000):
+        assert classify_error(error_message) is original_classify(error_message), repr(error_message)
+
+
+def test_hyperscan_matches_regex_fallback(monkeypatch):
+    """The single Hyperscan pass picks the same pattern as the regex fallback"""
+    pytest.importorskip("hyperscan")
+    assert enhanced_error_handler._ERROR_DB is not None
+    errors = list(random_errors(5000, seed=1))
+    with_hyperscan = [classify_error(error_message) for error_message in errors]
+    monkeypatch.setattr(enhanced_error_handler, "_ERROR_DB", None)
+    for error_message, info in zip(errors, with_hyperscan):
+        assert info is classify_error(error_message), repr(error_message)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
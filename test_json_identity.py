@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test vendor/product identification of JSON logs (json.loads and ijson streaming)
+"""
+
+import json
+import random
+
+import pytest
+
+import compact_ui
+from compact_ui import JSON_PRODUCT_KEYS, JSON_VENDOR_KEYS, extract_json_identity_fields
+
+KEYS = ["vendor", "source", "service", "product", "application", "app", "message", "host"]
+
+
+def original_identity(text):
+    """The if/elif lookups extract_json_identity_fields replaced"""
+    json_data = json.loads(text)
+    vendor = "Unknown"
+    product = "JSON Logger"
+    if "vendor" in json_data:
+        vendor = json_data["vendor"]
+    elif "source" in json_data:
+        vendor = json_data["source"]
+    elif "service" in json_data:
+        vendor = json_data["service"]
+    if "product" in json_data:
+        product = json_data["product"]
+    elif "application" in json_data:
+        product = json_data["application"]
+    elif "app" in json_data:
+        product = json_data["app"]
+    return vendor, product
+
+
+def identity(text):
+    """Vendor/product as picked by the JSON branch of the profile detection"""
+    json_fields = extract_json_identity_fields(text)
+    vendor = next((json_fields[key] for key in JSON_VENDOR_KEYS if key in json_fields), "Unknown")
+    product = next((json_fields[key] for key in JSON_PRODUCT_KEYS if key in json_fields), "JSON Logger")
+    return vendor, product
+
+
+def random_logs(count, seed=0):
+    """JSON objects with string identity fields, some nested under other keys"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        record = {}
+        for key in rng.sample(KEYS, rng.randint(0, len(KEYS))):
+            if rng.random() < 0.2:
+                record[key] = {rng.choice(KEYS): f"nested-{key}"}
+            else:
+                record[key] = f"{key}-{rng.randint(0, 9)}"
+        yield json.dumps(record)
+
+
+def test_picks_highest_priority_keys():
+    """vendor beats source/service and product beats application/app"""
+    text = '{"service": "svc", "app": "a", "vendor": "acme", "product": "gw", "source": "src"}'
+    assert identity(text) == ("acme", "gw")
+    assert identity('{"message": "hello"}') == ("Unknown", "JSON Logger")
+    assert extract_json_identity_fields('[{"vendor": "acme"}]') == {}
+
+
+def test_parse_matches_original():
+    """Small payloads pick the same vendor and product as before"""
+    for text in random_logs(2000):
+        record = json.loads(text)
+        if any(isinstance(value, dict) for value in record.values()):
+            continue
+        assert identity(text) == original_identity(text), text
+
+
+def test_streaming_matches_parse(monkeypatch):
+    """The ijson path picks the same vendor and product as json.loads"""
+    pytest.importorskip("ijson")
+    texts = list(random_logs(2000, seed=1))
+    parsed = [identity(text) for text in texts]
+    monkeypatch.setattr(compact_ui, "JSON_STREAM_THRESHOLD", 0)
+    for text, expected in zip(texts, parsed):
+        assert identity(text) == expected, text
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test row iteration over knowledge JSON files (json parse and ijson streaming)
+"""
+
+import json
+import random
+
+import pytest
+
+import complete_rag_system
+from complete_rag_system import CompleteRAGSystem
+
+
+def original_rows(path):
+    """Row normalization as done before streaming was added"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        rows = data.get("rows") or data.get("items") or []
+        if not isinstance(rows, list):
+            rows = [data]
+        return rows
+    return []
+
+
+def random_row(rng):
+    return {
+        "observer.vendor": rng.choice(["Cisco", "Fortinet", "Palo Alto", "ünïcode", ""]),
+        "observer.product": rng.choice(["ASA", "FortiGate", None]),
+        "log_type": rng.choice(["Security", "Network"]),
+        "score": rng.choice([0, -3, 1.5, 2.25e-7, 10 ** 20]),
+        "tags": rng.sample(["a", "b", "c"], rng.randint(0, 3)),
+    }
+
+
+DOCUMENTS = [
+    [{"a": 1}, {"b": 2}],
+    {"rows": [{"a": 1}]},
+    {"items": [{"b": 2}]},
+    {"rows": [], "items": [{"c": 3}]},
+    {"rows": {"not": "a list"}},
+    {"observer.vendor": "Cisco"},
+    "just a string",
+    [],
+]
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_rows_match_original(tmp_path, document):
+    """Lists, rows/items dicts, single-row dicts and scalars normalize as before"""
+    path = tmp_path / "sourcelist.json"
+    path.write_text(json.dumps(document), encoding="utf-8")
+    assert list(CompleteRAGSystem._iter_json_rows(str(path))) == original_rows(path)
+
+
+def test_streamed_array_matches_parse(tmp_path, monkeypatch):
+    """Large top-level arrays stream the same rows json.load returns"""
+    pytest.importorskip("ijson")
+    rng = random.Random(0)
+    path = tmp_path / "sourcelist.json"
+    path.write_text("  \n" + json.dumps([random_row(rng) for _ in range(500)], indent=1), encoding="utf-8")
+    monkeypatch.setattr(complete_rag_system, "JSON_STREAM_THRESHOLD", 0)
+    assert list(CompleteRAGSystem._iter_json_rows(str(path))) == original_rows(path)
+
+
+def test_stream_falls_back_after_yielded_rows(tmp_path, monkeypatch):
+    """A row ijson cannot decode switches to a full parse without repeating rows"""
+    pytest.importorskip("ijson")
+    path = tmp_path / "sourcelist.json"
+    path.write_text('[{"a": 1}, {"b": 2}, {"big": 100000000000000000000}, {"c": 3}]', encoding="utf-8")
+    monkeypatch.setattr(complete_rag_system, "JSON_STREAM_THRESHOLD", 0)
+    assert list(CompleteRAGSystem._iter_json_rows(str(path))) == original_rows(path)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test the manifest-based incremental LangChain index build
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import complete_rag_system
+from complete_rag_system import CompleteRAGSystem, _chunk_ids
+
+
+class FakeEmbeddingModel:
+    """Deterministic stand-in for the SentenceTransformer that records what it encodes"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend(texts)
+        rows = np.zeros((len(texts), 8), dtype=np.float32)
+        for row, text in zip(rows, texts):
+            row[hash(text) % 8] = 1.0
+        return rows
+
+
+@pytest.fixture
+def rag(tmp_path):
+    rag = CompleteRAGSystem(chroma_persist_directory=str(tmp_path / "chroma"), data_directory=str(tmp_path / "data"))
+    rag.embedding_model = FakeEmbeddingModel()
+    return rag
+
+
+def write(rag, name, lines):
+    path = os.path.join(rag.data_directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    return path
+
+
+def indexed_sources(rag):
+    return sorted({metadata["source"] for metadata in rag.collection.get(include=["metadatas"])["metadatas"]})
+
+
+def test_unchanged_files_are_not_reembedded(rag):
+    """A second build with no changes embeds nothing and keeps every chunk"""
+    write(rag, "a.vrl", [f".a{i} = {i}" for i in range(7)])
+    write(rag, "b.md", ["# title", "", "text"])
+    assert rag.build_langchain_index()
+    assert len(rag.embedding_model.encoded) == 4
+    count = rag.collection.count()
+
+    rag.embedding_model.encoded.clear()
+    assert rag.build_langchain_index()
+    assert rag.embedding_model.encoded == []
+    assert rag.collection.count() == count
+
+
+def test_changed_and_deleted_files(rag):
+    """Only a changed file is re-embedded; chunks of changed and deleted files are replaced or removed"""
+    a = write(rag, "a.vrl", [".a = 1", ".b = 2", ".c = 3", ".d = 4"])
+    b = write(rag, "b.txt", ["keep me"])
+    c = write(rag, "c.txt", ["delete me"])
+    assert rag.build_langchain_index()
+
+    rag.embedding_model.encoded.clear()
+    mtime_ns = os.stat(a).st_mtime_ns
+    write(rag, "a.vrl", [".a = 1", ".b = 2", ".c = 3", ".e = 5"])
+    os.utime(a, ns=(mtime_ns + 10 ** 9, mtime_ns + 10 ** 9))  # same size: make sure the mtime moves
+    os.remove(c)
+    assert rag.build_langchain_index()
+
+    assert sorted(rag.embedding_model.encoded) == [".a = 1\n.b = 2\n.c = 3", ".e = 5"]
+    assert indexed_sources(rag) == sorted([a, b])
+    assert sorted(rag.collection.get()["documents"]) == sorted([".a = 1\n.b = 2\n.c = 3", ".e = 5", "keep me"])
+
+
+def test_touched_file_is_hashed_but_not_reembedded(rag):
+    """A new mtime with identical content is rehashed, recorded, and not re-embedded"""
+    a = write(rag, "a.vrl", [".a = 1"])
+    assert rag.build_langchain_index()
+    stat = os.stat(a)
+    os.utime(a, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    rag.embedding_model.encoded.clear()
+    assert rag.build_langchain_index()
+    assert rag.embedding_model.encoded == []
+    assert rag._load_index_manifest()[a]["mtime_ns"] == stat.st_mtime_ns + 10 ** 9
+
+
+def test_scan_trusts_size_and_mtime(rag, monkeypatch):
+    """Files whose size and mtime match the manifest are not read again"""
+    a = write(rag, "a.vrl", [".a = 1"])
+    current, changed = rag._scan_index_files({})
+    assert changed == [a]
+
+    def fail(path):
+        raise AssertionError(f"{path} was hashed again")
+
+    monkeypatch.setattr(complete_rag_system, "_mapped", fail)
+    assert rag._scan_index_files(current) == (current, [])
+
+
+def test_manifest_of_another_model_is_ignored(rag):
+    """A manifest written for another embedding model forces a full rebuild"""
+    write(rag, "a.vrl", [".a = 1"])
+    assert rag.build_langchain_index()
+    assert rag._load_index_manifest()
+
+    rag.embedding_model_name = "another-model"
+    assert rag._load_index_manifest() == {}
+
+
+class RecordingCollection:
+    """Collection stand-in that records upsert calls"""
+
+    def __init__(self):
+        self.upserts = []
+
+    def upsert(self, **kwargs):
+        self.upserts.append(kwargs)
+
+
+class LimitedClient:
+    max_batch_size = 3
+
+
+def test_upsert_in_batches(rag, monkeypatch):
+    """Upserts are sliced to min(CHROMA_ADD_BATCH, max_batch_size) and cover every row once"""
+    monkeypatch.setattr(complete_rag_system, "CHROMA_ADD_BATCH", 4)
+    rag.chroma_client = LimitedClient()
+    rag.collection = RecordingCollection()
+    rag._result_cache.put(("search", 0, 1), "q", np.ones(8, dtype=np.float32), ["stale"])
+    ids = [f"id{i}" for i in range(8)]
+    embeddings = np.arange(64, dtype=np.float32).reshape(8, 8)
+
+    rag._upsert_in_batches([f"doc{i}" for i in range(8)], [{"n": i} for i in range(8)], ids, embeddings)
+
+    upserts = rag.collection.upserts
+    assert [len(call["ids"]) for call in upserts] == [3, 3, 2]
+    assert [i for call in upserts for i in call["ids"]] == ids
+    assert [m["n"] for call in upserts for m in call["metadatas"]] == list(range(8))
+    assert np.array_equal(np.concatenate([np.asarray(call["embeddings"]) for call in upserts]), embeddings)
+    assert rag._result_cache.get(("search", 0, 1), "q", np.ones(8, dtype=np.float32)) is None
+
+    rag.chroma_client = object()
+    rag.collection = RecordingCollection()
+    rag._upsert_in_batches(["a"] * 5, [{}] * 5, [str(i) for i in range(5)], embeddings[:5])
+    assert [len(call["ids"]) for call in rag.collection.upserts] == [4, 1]
+
+
+def test_chunk_ids():
+    """Chunk ids are stable, depend on the source, and number repeats within a file"""
+    ids = _chunk_ids("data/a.vrl", ["x", "y", "x", "x"])
+    assert ids == _chunk_ids("data/a.vrl", ["x", "y", "x", "x"])
+    assert ids[2] == f"{ids[0]}_1" and ids[3] == f"{ids[0]}_2"
+    assert len(set(ids)) == 4
+    assert _chunk_ids("data/b.vrl", ["x"])[0] != ids[0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test RFC5424 header parsing used for log profiling
+"""
+
+import random
+import re
+
+from compact_ui import parse_rfc5424_header
+
+# The regex-only implementation the fast path must agree with
+_ORIGINAL_HEADER_RE = re.compile(r'<(\d+)>(\d+)\s+\S+\s+(\S+)\s+(\S+)\s+')
+
+
+def original_parse_rfc5424_header(line):
+    syslog_match = _ORIGINAL_HEADER_RE.search(line)
+    if syslog_match:
+        return syslog_match.group(3), syslog_match.group(4)
+    return None
+
+
+def test_well_formed_header():
+    """Hostname and program come from a header at the start of the line"""
+    line = "<190>1 2025-09-18T07:40:33.360853+00:00 ma1-ipa-master httpd-error - - - message"
+    assert parse_rfc5424_header(line) == ("ma1-ipa-master", "httpd-error")
+
+
+def test_version_must_follow_priority():
+    """'<34> 1 ...' is not a header: the version has to follow '>' directly"""
+    assert parse_rfc5424_header("<34> 1 2025-09-18T07:40:33Z host app - msg") is None
+    assert parse_rfc5424_header("<34>\t1 2025-09-18T07:40:33Z host app - msg") is None
+
+
+def test_header_inside_line():
+    """A header after some prefix is still found"""
+    line = "Sep 18 07:40:33 relay <34>1 2025-09-18T07:40:33Z host app - msg"
+    assert parse_rfc5424_header(line) == ("host", "app")
+
+
+def test_matches_original_regex():
+    """Random header-like lines parse exactly as with the original regex"""
+    alphabet = ['<', '>', '1', '3', '4', ' ', '\t', 'a', '-', ':', '²', ' ']
+    rng = random.Random(0)
+    for _ in range(50000):
+        line = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 24)))
+        assert parse_rfc5424_header(line) == original_parse_rfc5424_header(line), repr(line)
+
+
+if __name__ == "__main__":
+    test_well_formed_header()
+    test_version_must_follow_priority()
+    test_header_inside_line()
+    test_matches_original_regex()
+    print("✅ RFC5424 header parsing tests passed")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test the log profile JSON shown in the UI
+"""
+
+import json
+
+from compact_ui import format_profile_json
+
+PROFILE = {"log_format": "Syslog", "log_source": "cisco_asa", "product": "asa", "vendor": "cisco"}
+
+
+def original_profile_json(profile, observer_type):
+    """The f-string the profile JSON was built with before"""
+    return f"""{{
+    "observer.type": "{observer_type}",
+    "log_format": "{profile['log_format']}",
+    "observer.source": "{profile['log_source']}",
+    "observer.product": "{profile['product']}",
+    "observer.vendor": "{profile['vendor']}"
+}}"""
+
+
+def test_plain_values_match_original():
+    """Ordinary values render exactly as before, non-ASCII included"""
+    for profile in (PROFILE, {**PROFILE, "vendor": "Fortinét", "product": "FortiGate 60F"}):
+        assert format_profile_json(profile, "ngfw") == original_profile_json(profile, "ngfw")
+
+
+def test_quotes_and_backslashes_stay_valid_json():
+    """Values with quotes or backslashes still produce parseable JSON"""
+    profile = {**PROFILE, "product": 'the "ASA"', "log_source": "C:\\logs\\asa"}
+    assert json.loads(format_profile_json(profile, "ngfw")) == {
+        "observer.type": "ngfw",
+        "log_format": "Syslog",
+        "observer.source": "C:\\logs\\asa",
+        "observer.product": 'the "ASA"',
+        "observer.vendor": "cisco",
+    }
+
+
+if __name__ == "__main__":
+    test_plain_values_match_original()
+    test_quotes_and_backslashes_stay_valid_json()
+    print("✅ Profile JSON tests passed")
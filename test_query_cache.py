@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test the query result cache (SemanticQueryCache) and its use by CompleteRAGSystem.search
+"""
+
+import numpy as np
+
+from complete_rag_system import CompleteRAGSystem, SemanticQueryCache
+
+SCOPE = ("search", 1, 5)
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_exact_query_hits():
+    """The same query text, up to whitespace, returns a copy of the stored results"""
+    cache = SemanticQueryCache(max_entries=4)
+    cache.put(SCOPE, "cisco  asa\tfirewall", unit(1, 0), [{"content": "a"}])
+
+    results = cache.get(SCOPE, " cisco asa firewall ", unit(0, 1))
+    assert results == [{"content": "a"}]
+    results.append({"content": "b"})
+    assert cache.get(SCOPE, "cisco asa firewall", unit(1, 0)) == [{"content": "a"}]
+
+
+def test_other_query_misses_by_default():
+    """Without a threshold, another query misses even with an identical embedding"""
+    cache = SemanticQueryCache(max_entries=4)
+    cache.put(SCOPE, "cisco asa firewall", unit(1, 0), [{"content": "a"}])
+
+    assert cache.get(SCOPE, "cisco asa router", unit(1, 0)) is None
+    assert cache.get(("search", 2, 5), "cisco asa firewall", unit(1, 0)) is None
+
+
+def test_threshold_is_opt_in():
+    """With a threshold, a near-identical embedding in the same scope hits"""
+    cache = SemanticQueryCache(max_entries=4, threshold=0.97)
+    cache.put(SCOPE, "cisco asa firewall", unit(1, 0), [{"content": "a"}])
+
+    assert cache.get(SCOPE, "cisco asa fw", unit(1, 0.1)) == [{"content": "a"}]
+    assert cache.get(SCOPE, "fortigate", unit(1, 1)) is None
+
+
+def test_full_scope_overwrites_oldest():
+    """A full scope overwrites its oldest entry and forgets that query"""
+    cache = SemanticQueryCache(max_entries=2)
+    for i, query in enumerate(["one", "two", "three"]):
+        cache.put(SCOPE, query, unit(1, i), [{"n": i}])
+    cache.put(SCOPE, "two", unit(1, 1), [{"n": 22}])
+
+    assert cache.get(SCOPE, "one", unit(1, 0)) is None
+    assert cache.get(SCOPE, "two", unit(1, 1)) == [{"n": 22}]
+    assert cache.get(SCOPE, "three", unit(1, 2)) == [{"n": 2}]
+    assert sorted(cache.scopes[SCOPE][1]) == ["three", "two"]
+
+
+class FakeEmbeddingModel:
+    def encode(self, texts, **kwargs):
+        return np.stack([unit(1, len(text)) for text in texts])
+
+
+class FakeCollection:
+    """Collection stand-in answering every query with its name"""
+
+    def __init__(self, name):
+        self.name = name
+        self.queries = 0
+
+    def query(self, **kwargs):
+        self.queries += 1
+        return {"documents": [[self.name]], "metadatas": [[{}]], "distances": [[0.0]]}
+
+
+def test_search_results_follow_the_collection(tmp_path):
+    """Repeated searches are served from the cache until the collection is replaced"""
+    rag = CompleteRAGSystem(chroma_persist_directory=str(tmp_path / "chroma"), data_directory=str(tmp_path / "data"))
+    rag.embedding_model = FakeEmbeddingModel()
+    first, second = FakeCollection("first"), FakeCollection("second")
+
+    rag.collection = first
+    assert rag.search("cisco asa")[0]["page_content"] == "first"
+    assert rag.search("cisco  asa")[0]["page_content"] == "first"
+    assert first.queries == 1
+
+    rag.collection = second
+    rag._collection_changed()
+    assert rag.search("cisco asa")[0]["page_content"] == "second"
+    assert second.queries == 1
+
+
+if __name__ == "__main__":
+    test_exact_query_hits()
+    test_other_query_misses_by_default()
+    test_threshold_is_opt_in()
+    test_full_scope_overwrites_oldest()
+    print("✅ Query cache tests passed")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test the near-duplicate regeneration cache (SemanticVRLCache)
+"""
+
+import os
+import subprocess
+import sys
+
+from enhanced_error_handler import SemanticVRLCache
+
+VRL = '.event.original = del(.message)\n'
+
+ERROR = """x Failed to load ["/app/temp_config_4711_3.yaml"]
+error[E110]: invalid argument type
+  ┌─ :12:7
+  │
+12 │   parse_grok(.message, "%{IP:source.ip} %{WORD:action} from interface outside to inside")
+  │              ^^^^^^^^ this expression resolves to any, but the parameter "value" expects the exact type string
+  │
+  = try: ensuring an appropriate type at runtime"""
+
+
+def test_near_duplicate_error_hits():
+    """Same error at other line/column numbers or in another temp config file reuses the result"""
+    cache = SemanticVRLCache()
+    cache.put(VRL, ERROR, "syslog", {"new_vrl": "fixed"})
+
+    assert cache.get(VRL, ERROR.replace(":12:7", ":40:3").replace("12 │", "40 │"), "syslog") == {"new_vrl": "fixed"}
+    assert cache.get(VRL, ERROR.replace("4711_3", "982_17"), "syslog") == {"new_vrl": "fixed"}
+
+
+def test_different_error_misses():
+    """A different error, the same error for other VRL, or another log format is a miss"""
+    cache = SemanticVRLCache()
+    cache.put(VRL, ERROR, "syslog", {"new_vrl": "fixed"})
+
+    assert cache.get(VRL, "error[E701]: call to undefined variable\n  ┌─ :19:3\n  │\n19 │   exit\n  │   ^^^^ undefined variable", "syslog") is None
+    assert cache.get(VRL, "error[E110]: invalid argument type", "syslog") is None
+    assert cache.get(VRL + ".x = 1\n", ERROR, "syslog") is None
+    assert cache.get(VRL, ERROR, "json") is None
+
+
+def test_eviction_keeps_buckets_consistent():
+    """Evicted entries leave no bucket references behind"""
+    cache = SemanticVRLCache(max_entries=2)
+    errors = [f"error: {word} is not a valid {word} value" for word in ("alpha", "bravo", "charlie", "delta", "echo")]
+    for i, error in enumerate(errors):
+        cache.put(VRL, error, "syslog", {"n": i})
+
+    assert len(cache.entries) == 2
+    assert set().union(*cache.buckets.values()) == set(cache.entries)
+    assert cache.get(VRL, errors[0], "syslog") is None
+    assert cache.get(VRL, errors[4], "syslog") == {"n": 4}
+
+
+def test_signature_is_stable_across_processes():
+    """Signatures do not depend on the interpreter's string hash seed"""
+    code = (
+        "from enhanced_error_handler import SemanticVRLCache as C; c = C(); "
+        "print(c._signature(c._shingles('error[E110]: invalid argument type at line 12')))"
+    )
+    signatures = set()
+    for seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        signatures.add(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                      env=env, cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout)
+    assert len(signatures) == 1
+
+
+if __name__ == "__main__":
+    test_near_duplicate_error_hits()
+    test_different_error_misses()
+    test_eviction_keeps_buckets_consistent()
+    test_signature_is_stable_across_processes()
+    print("✅ SemanticVRLCache tests passed")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test table-driven syslog vendor detection (Hyperscan and regex fallback)
+"""
+
+import random
+import re
+
+import pytest
+
+import compact_ui
+from compact_ui import SYSLOG_VENDOR_RULES, detect_syslog_vendor
+
+# The if/elif ladder order the rule table replaced
+ORIGINAL_VENDOR_PATTERNS = [
+    (r'(?i)(cisco|asa|ios|nexus|cat|switch|router)', "cisco"),
+    (r'(?i)(fortinet|fortigate|forti)', "fortinet"),
+    (r'(?i)(palo\s+alto|panos|pa-)', "paloalto"),
+    (r'(?i)(checkpoint|check\s+point|cp-)', "checkpoint"),
+    (r'(?i)(sonicwall|sonicos)', "sonicwall"),
+    (r'(?i)(sshd|accepted password|failed password)', "OpenSSH"),
+    (r'(?i)(firewall|iptables|ufw|pfsense)', "Linux"),
+    (r'(?i)(apache|nginx|httpd)', "Web Server"),
+    (r'(?i)(mysql|postgres|mongodb)', "Database"),
+    (r'(?i)(dirsrv|ipa|ldap|directory)', "RedHat"),
+    (r'(?i)(windows|microsoft|win32)', "microsoft"),
+    (r'(?i)(linux|ubuntu|centos|rhel)', "linux"),
+]
+
+WORDS = ["cisco", "ASA", "Nexus", "fortigate", "palo alto", "palo\talto", "palo\u00a0alto", "pa-",
+         "check point", "ſshd", "SonicOS", "sshd", "Failed password", "ufw", "nginx", "postgres", "dirsrv", "win32",
+         "ubuntu", "kernel", "cron", "host-01", "app", "<34>1", "-", " "]
+
+
+def original_vendor(log_content):
+    for pattern, vendor in ORIGINAL_VENDOR_PATTERNS:
+        if re.search(pattern, log_content):
+            return vendor
+    return None
+
+
+def random_logs(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 6)))
+
+
+def detected_vendor(log_content):
+    rule = detect_syslog_vendor(log_content)
+    return rule[1] if rule else None
+
+
+def test_priority_order():
+    """The first rule in table order wins when several vendors match"""
+    assert detected_vendor("<34>1 2025-01-01T00:00:00Z fw01 sshd - cisco asa") == "cisco"
+    assert detected_vendor("<34>1 2025-01-01T00:00:00Z web01 nginx - proxy to mysql") == "Web Server"
+    assert detected_vendor("<34>1 2025-01-01T00:00:00Z host kernel - boot") is None
+
+
+def test_regex_fallback_matches_original(monkeypatch):
+    """Without Hyperscan, detection matches the original if/elif ladder"""
+    monkeypatch.setattr(compact_ui, "_VENDOR_DB", None)
+    for log_content in random_logs(5000):
+        assert detected_vendor(log_content) == original_vendor(log_content), log_content
+
+
+def test_hyperscan_matches_regex_fallback(monkeypatch):
+    """The single Hyperscan pass picks the same rule as the regex fallback"""
+    pytest.importorskip("hyperscan")
+    assert compact_ui._VENDOR_DB is not None
+    logs = list(random_logs(5000, seed=1))
+    with_hyperscan = [detect_syslog_vendor(log_content) for log_content in logs]
+    monkeypatch.setattr(compact_ui, "_VENDOR_DB", None)
+    for log_content, rule in zip(logs, with_hyperscan):
+        assert rule == detect_syslog_vendor(log_content), log_content
+
+
+def test_rule_table_covers_original_ladder():
+    """Every branch of the original ladder has a rule, in the same order"""
+    assert [rule[1] for rule in SYSLOG_VENDOR_RULES] == [vendor for _, vendor in ORIGINAL_VENDOR_PATTERNS]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
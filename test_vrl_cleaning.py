@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test cleaning of LLM-generated VRL output (_clean_vrl_output)
+"""
+
+import random
+import re
+
+from lc_bridge import _clean_vrl_output, _fix_vrl_syntax, _generate_basic_vrl, _validate_vrl_structure
+
+FRAGMENTS = [
+    '.event.kind = "event"', '.event.category = ["network"]', '.observer.vendor = "acme"',
+    '.observer.product = "fw"', '  .event_data.action = "allow"  ', 'srcip = .src', 'dstip=.dst',
+    'x = 1;', '# comment', '// comment', '```vrl', 'Here is the VRL', '1. step', 'Rules: none',
+    'Missing some input keys: {"k"}', '.event_data = { "k" => "v" }', 'event_data {"k"=>"v"}',
+    '.a = {\n"k" =>\n"v"\n}', '.b = "=>"', 'event_data {', '"k" => "v" }', '', '   ', '\t',
+    'connection_id: 1', 'if exists(.message) {', '}',
+]
+
+
+def original_clean_vrl_output(vrl_output):
+    """_clean_vrl_output before the single-pass and startswith-tuple changes"""
+    sanitized = vrl_output
+    sanitized = "\n".join(
+        line for line in sanitized.split('\n')
+        if 'Missing some input keys' not in line
+    )
+    sanitized = re.sub(r'event_data\s*\{\s*"k"\s*=>\s*"v"\s*\}', '.event_data = {}', sanitized)
+    sanitized = re.sub(r'\{\s*"k"\s*=>\s*"v"\s*\}', '{}', sanitized)
+    sanitized = "\n".join(line for line in sanitized.split('\n') if '=>' not in line)
+
+    vrl_lines = []
+    for line in sanitized.split('\n'):
+        line = line.strip()
+        if (line and
+            not line.startswith('#') and
+            not line.startswith('//') and
+            not line.startswith('```') and
+            not line.startswith('ECS') and
+            not line.startswith('Type:') and
+            not line.startswith('Description:') and
+            not line.startswith('Generated VRL') and
+            not line.startswith('Here is') and
+            not line.startswith('The VRL') and
+            not line.startswith('Based on') and
+            not line.startswith('Following') and
+            not line.startswith('Rules:') and
+            not line.startswith('IMPORTANT:') and
+            not line.startswith('You are') and
+            not line.startswith('Missing some input keys') and
+            not line.startswith('1.') and
+            not line.startswith('2.') and
+            not line.startswith('3.') and
+            not line.startswith('4.')):
+            line = _fix_vrl_syntax(line)
+            if line:
+                vrl_lines.append(line)
+
+    if len(vrl_lines) < 3 or any('Missing some input keys' in line for line in vrl_lines):
+        return _generate_basic_vrl()
+
+    vrl_text = '\n'.join(vrl_lines)
+    if not _validate_vrl_structure(vrl_text):
+        return _generate_basic_vrl()
+    return vrl_text
+
+
+def test_strips_prose_and_placeholders():
+    """Markdown, prose and placeholder maps are removed from valid VRL"""
+    output = "\n".join([
+        "Here is the VRL:", "```vrl", '.event.kind = "event"', '.event.category = ["network"]',
+        'event_data {"k" => "v"}', '.observer.vendor = "acme"', "```",
+    ])
+    assert _clean_vrl_output(output) == "\n".join([
+        '.event.kind = "event"', '.event.category = ["network"]', '.event_data = {}', '.observer.vendor = "acme"',
+    ])
+
+
+def test_falls_back_to_basic_vrl():
+    """Too little or malformed VRL is replaced by the basic parser"""
+    assert _clean_vrl_output("Here is the VRL:\n.event.kind = \"event\"") == _generate_basic_vrl()
+    assert _clean_vrl_output('.event.kind = "event"\n.observer.vendor = "a"\nconnection_id: 1') == _generate_basic_vrl()
+
+
+def test_matches_original_implementation():
+    """Random LLM-like outputs clean to exactly what the original did"""
+    rng = random.Random(0)
+    for _ in range(20000):
+        output = "\n".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 10)))
+        assert _clean_vrl_output(output) == original_clean_vrl_output(output), repr(output)
+
+
+if __name__ == "__main__":
+    test_strips_prose_and_placeholders()
+    test_falls_back_to_basic_vrl()
+    test_matches_original_implementation()
+    print("✅ VRL output cleaning tests passed")